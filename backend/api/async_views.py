@@ -0,0 +1,158 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.db import close_old_connections
+from django.urls import URLPattern
+
+from .db_routing import check_connections
+
+executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_DB_THREADS, thread_name_prefix='async-db')
+# Поток выгрузки занят, пока клиент читает ответ, поэтому у выгрузок
+# свой пул: медленные клиенты не занимают потоки запросов к БД, а число
+# одновременных выгрузок ограничено ASYNC_STREAM_THREADS.
+stream_executor = ThreadPoolExecutor(
+    max_workers=settings.ASYNC_STREAM_THREADS,
+    thread_name_prefix='async-stream')
+
+
+def call_with_connections(func, *args, **kwargs):
+    """Выполняет func в потоке пула, закрывая устаревшие и неработающие
+    соединения с базой данных, как это делает обработчик запросов."""
+    close_old_connections()
+    check_connections()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def run_in_executor(pool, func, *args, **kwargs):
+    context = contextvars.copy_context()
+    return asyncio.get_running_loop().run_in_executor(
+        pool, functools.partial(
+            context.run, call_with_connections, func, *args, **kwargs))
+
+
+async def run_in_pool(func, *args, **kwargs):
+    """Выполняет синхронный код в ограниченном пуле потоков.
+
+    Контекст запроса копируется в поток пула, поэтому запросы к базе
+    данных учитываются в метриках.
+    """
+    return await run_in_executor(executor, func, *args, **kwargs)
+
+
+async def iterate_in_pool(iterator, maxsize=8):
+    """Перебирает синхронный итератор в одном потоке пула выгрузок.
+
+    Части передаются через очередь из maxsize элементов: поток ждет, пока
+    клиент заберет данные, поэтому память не растет с размером ответа, а
+    первая часть отправляется сразу. Весь перебор идет в одном потоке,
+    так что курсор базы данных не переходит между соединениями, но поток
+    занят до конца передачи. Если все ASYNC_STREAM_THREADS потоков
+    заняты, новая выгрузка ждет свободного.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize)
+    stopped = threading.Event()
+    done = object()
+
+    def put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def produce():
+        try:
+            for part in iterator:
+                if stopped.is_set():
+                    return
+                put(part)
+        finally:
+            if not stopped.is_set():
+                put(done)
+
+    producer = asyncio.ensure_future(
+        run_in_executor(stream_executor, produce))
+    try:
+        while True:
+            part = await queue.get()
+            if part is done:
+                # Пробрасывает исключение итератора.
+                await producer
+                return
+            yield part
+    finally:
+        if not producer.done():
+            # Клиент отключился: останавливаем поток и освобождаем место
+            # в очереди, если он ждет его.
+            stopped.set()
+            while not queue.empty():
+                queue.get_nowait()
+
+
+class StreamingASGIHandler(ASGIHandler):
+    """Обработчик ASGI, перебирающий потоковые ответы в пуле потоков.
+
+    ASGIHandler в Django 3.2 перебирает StreamingHttpResponse синхронно в
+    цикле событий, где ORM запрещен, а медленный итератор блокирует все
+    запросы. Здесь части ответа читаются в пуле выгрузок через
+    iterate_in_pool.
+    """
+
+    async def send_response(self, response, send):
+        if not response.streaming:
+            return await super().send_response(response, send)
+        content = response.streaming_content
+        # Родительский метод отправит заголовки и пустое тело, а части
+        # ответа отправляются перед завершающим сообщением.
+        response.streaming_content = ()
+
+        async def send_with_content(message):
+            if (message['type'] == 'http.response.body'
+                    and 'body' not in message):
+                async for part in iterate_in_pool(content):
+                    for chunk, _ in self.chunk_bytes(part):
+                        await send({
+                            'type': 'http.response.body',
+                            'body': chunk,
+                            'more_body': True,
+                        })
+            await send(message)
+
+        await super().send_response(response, send_with_content)
+
+
+def render_response(view, request, *args, **kwargs):
+    response = view(request, *args, **kwargs)
+    if hasattr(response, 'render') and callable(response.render):
+        response = response.render()
+    return response
+
+
+def async_view(view):
+    """Превращает синхронное представление в асинхронное.
+
+    Представление и рендеринг ответа выполняются в пуле потоков,
+    медленные клиенты обслуживаются циклом событий без занятого потока.
+    """
+    @functools.wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        return await run_in_pool(
+            render_response, view, request, *args, **kwargs)
+    return wrapper
+
+
+def async_patterns(urlpatterns, names):
+    """Заменяет представления маршрутов с именами из names на
+    асинхронные."""
+    return [
+        URLPattern(pattern.pattern, async_view(pattern.callback),
+                   pattern.default_args, pattern.name)
+        if isinstance(pattern, URLPattern) and pattern.name in names
+        else pattern
+        for pattern in urlpatterns]
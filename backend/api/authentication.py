@@ -0,0 +1,142 @@
+import copy
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.conf import settings
+from django.utils.translation import gettext_lazy as _
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+from rest_framework.exceptions import AuthenticationFailed
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+class TokenCache:
+    """LRU кеш токенов процесса с ограниченным временем жизни записей.
+
+    Хранит токены с пользователями по ключу токена и отдает их копии,
+    чтобы запросы в разных потоках не изменяли общий объект. Записи
+    старше ttl секунд считаются отсутствующими, при превышении maxsize
+    вытесняются давно не использованные токены.
+    """
+
+    def __init__(self, maxsize, ttl):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.generation = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            token, expires = entry
+            if expires < time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+        return copy.deepcopy(token)
+
+    def set(self, key, token, generation):
+        """Сохраняет токен, если после generation ничего не удалялось.
+
+        Запрос, прочитавший токен из базы до выхода пользователя, не
+        вернет его в кеш после удаления.
+        """
+        if self.maxsize <= 0 or self.ttl <= 0:
+            return
+        with self.lock:
+            if generation != self.generation:
+                return
+            self.entries[key] = (token, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+
+    def delete(self, keys=(), user_id=None):
+        with self.lock:
+            self.generation += 1
+            keys = set(keys)
+            if user_id is not None:
+                keys.update(
+                    key for key, (token, _) in self.entries.items()
+                    if token.user_id == user_id)
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.generation += 1
+            self.entries.clear()
+
+
+token_cache = TokenCache(
+    settings.AUTH_TOKEN_CACHE_SIZE, settings.AUTH_TOKEN_CACHE_TTL)
+
+
+def record(event):
+    """Учитывает результат поиска токена."""
+    with _lock:
+        _stats[event] += 1
+
+
+def get_stats():
+    """Возвращает счетчики кеша токенов в этом процессе.
+
+    Каждое попадание экономит один запрос токена с пользователем к базе
+    данных, поэтому queries_saved равно числу попаданий.
+    """
+    with _lock:
+        stats = {event: _stats[event] for event in ('hits', 'misses')}
+    requests = stats['hits'] + stats['misses']
+    stats.update(
+        requests=requests,
+        hit_rate=stats['hits'] / requests if requests else 0.0,
+        queries_saved=stats['hits'],
+        size=len(token_cache.entries))
+    return stats
+
+
+def invalidate(keys=(), user_id=None):
+    """Удаляет токены из кеша процесса.
+
+    Если передан user_id, удаляются все токены пользователя. В других
+    воркерах записи устаревают не позднее чем через AUTH_TOKEN_CACHE_TTL
+    секунд.
+    """
+    token_cache.delete(keys, user_id)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Аутентификация по токену с кешем токенов в процессе.
+
+    Токен с пользователем ищется в LRU кеше воркера и только при промахе
+    в базе данных. Выход, смена пароля и деактивация сразу удаляют
+    токены из кеша воркера, обработавшего запрос, а в остальных воркерах
+    действуют через AUTH_TOKEN_CACHE_TTL секунд.
+    """
+
+    def authenticate_credentials(self, key):
+        token = token_cache.get(key)
+        if token is None:
+            record('misses')
+            token = self.get_token(key)
+        else:
+            record('hits')
+        if not token.user.is_active:
+            raise AuthenticationFailed(_('User inactive or deleted.'))
+        return token.user, token
+
+    def get_token(self, key):
+        generation = token_cache.generation
+        try:
+            token = self.get_model().objects.select_related(
+                'user').get(key=key)
+        except self.get_model().DoesNotExist:
+            raise AuthenticationFailed(_('Invalid token.'))
+        token_cache.set(key, copy.deepcopy(token), generation)
+        return token
@@ -0,0 +1,73 @@
+import hashlib
+import threading
+from collections import Counter
+
+from django.core.cache import cache
+
+CACHE_PREFIX = 'response'
+FRAGMENT_PREFIX = 'fragment'
+
+_lock = threading.Lock()
+_stats = Counter()
+
+
+def record(event):
+    """Учитывает попадание или промах кеша ответов."""
+    with _lock:
+        _stats[event] += 1
+
+
+def get_stats():
+    """Возвращает счетчики попаданий и промахов кеша в этом процессе."""
+    with _lock:
+        return {event: _stats[event] for event in (
+            'hits', 'misses', 'fragment_hits', 'fragment_misses')}
+
+
+def get_cache_key(request, name, content_versions):
+    """Строит ключ кеша по нормализованным параметрам запроса и версиям
+    данных, поэтому изменение данных делает старые записи недоступными."""
+    params = sorted(
+        (key, sorted(value for value in values if value))
+        for key, values in request.query_params.lists()
+        if any(values))
+    params = [
+        (key, values) for key, values in params
+        if not (key == 'page' and values == ['1'])]
+    versions = sorted(
+        (key, version) for key, (version, _) in content_versions.items())
+    raw = repr((request.scheme, request.get_host(), params, versions))
+    return f'{CACHE_PREFIX}:{name}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def get(key):
+    data = cache.get(key)
+    record('misses' if data is None else 'hits')
+    return data
+
+
+def set(key, data, timeout):
+    cache.set(key, data, timeout)
+
+
+def get_fragment_key(request, name, pk, changed_at, content_versions):
+    """Строит ключ фрагмента объекта по id, дате его изменения и версиям
+    связанных данных. Схема и хост входят в ключ из-за абсолютных
+    ссылок на изображения."""
+    versions = sorted(
+        (key, version) for key, (version, _) in content_versions.items())
+    raw = repr((request.scheme, request.get_host(), pk,
+                changed_at.timestamp(), versions))
+    return f'{FRAGMENT_PREFIX}:{name}:{hashlib.sha1(raw.encode()).hexdigest()}'
+
+
+def get_many(keys):
+    data = cache.get_many(keys)
+    with _lock:
+        _stats['fragment_hits'] += len(data)
+        _stats['fragment_misses'] += len(keys) - len(data)
+    return data
+
+
+def set_many(data, timeout):
+    cache.set_many(data, timeout)
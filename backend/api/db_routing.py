@@ -0,0 +1,132 @@
+import asyncio
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.utils.deprecation import MiddlewareMixin
+
+PIN_COOKIE = 'db_primary'
+PIN_CACHE_PREFIX = 'db_primary'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+read_alias = ContextVar('read_alias', default=None)
+
+
+def get_pin_key(user_id):
+    return f'{PIN_CACHE_PREFIX}:{user_id}'
+
+
+def is_pinned(request):
+    """Проверяет, писал ли пользователь недавно в основную базу."""
+    if request.COOKIES.get(PIN_COOKIE):
+        return True
+    if not settings.REPLICA_PIN_CACHE:
+        return False
+    user = getattr(request, 'user', None)
+    return bool(user and user.is_authenticated
+                and cache.get(get_pin_key(user.id)))
+
+
+def pin(request, response):
+    """Закрепляет пользователя за основной базой после записи."""
+    if (request.method in SAFE_METHODS or response.status_code >= 400
+            or not settings.DATABASE_REPLICAS):
+        return response
+    user = getattr(request, 'user', None)
+    if (settings.REPLICA_PIN_CACHE and user is not None
+            and user.is_authenticated):
+        cache.set(get_pin_key(user.id), True, settings.REPLICA_PIN_SECONDS)
+    response.set_cookie(
+        PIN_COOKIE, '1', max_age=settings.REPLICA_PIN_SECONDS,
+        httponly=True, samesite='Lax')
+    return response
+
+
+def check_connections():
+    """Отмечает постоянные соединения потока для проверки в этом запросе.
+
+    В Django 3.2 нет настройки CONN_HEALTH_CHECKS из Django 4.1, поэтому
+    она повторена здесь: соединение проверяется при первом обращении
+    маршрутизатора к его базе, а не для всех баз в начале запроса.
+    """
+    if not settings.CONN_HEALTH_CHECKS:
+        return
+    for connection in connections.all():
+        connection.health_check_needed = connection.connection is not None
+
+
+def check_connection(alias):
+    """Закрывает соединение, переставшее отвечать, перед первым запросом
+    к базе alias, чтобы Django открыл новое."""
+    connection = connections[alias]
+    if not getattr(connection, 'health_check_needed', False):
+        return alias
+    connection.health_check_needed = False
+    if (connection.connection is not None
+            and not connection.in_atomic_block
+            and not connection.is_usable()):
+        connection.close()
+    return alias
+
+
+class ReplicaRouter:
+    """Маршрутизатор запросов между основной базой и репликами.
+
+    Чтение уходит на реплику, выбранную для текущего запроса в
+    ReplicaReadMixin, запись и чтение внутри транзакций всегда идут в
+    основную базу.
+    """
+
+    def db_for_read(self, model, **hints):
+        alias = read_alias.get()
+        if alias is None or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return check_connection(DEFAULT_DB_ALIAS)
+        return check_connection(alias)
+
+    def db_for_write(self, model, **hints):
+        return check_connection(DEFAULT_DB_ALIAS)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+
+class ReplicaReadMixin:
+    """Миксин чтения с реплик для безопасных запросов вьюсета.
+
+    Реплика выбирается после аутентификации, если действие входит в
+    replica_actions, а пользователь не закреплен за основной базой
+    недавней записью.
+    """
+
+    replica_actions = ('list', 'retrieve')
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if (settings.DATABASE_REPLICAS
+                and request.method in SAFE_METHODS
+                and self.action in self.replica_actions
+                and not is_pinned(request)):
+            self.read_alias_token = read_alias.set(
+                random.choice(settings.DATABASE_REPLICAS))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        token = getattr(self, 'read_alias_token', None)
+        if token is not None:
+            read_alias.reset(token)
+            self.read_alias_token = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class PrimaryPinMiddleware(MiddlewareMixin):
+    """Закрепляет пользователя за основной базой на REPLICA_PIN_SECONDS
+    после успешного изменяющего запроса, чтобы он видел свои записи."""
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        return pin(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return pin(request, await self.get_response(request))
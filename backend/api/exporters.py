@@ -0,0 +1,119 @@
+import csv
+import json
+
+from rest_framework.exceptions import ValidationError
+from rest_framework.negotiation import DefaultContentNegotiation
+
+
+class ShoppingCartExporter:
+    """Базовый класс выгрузки списка покупок.
+
+    Наследники задают формат, тип содержимого и построчное представление
+    ингредиентов, выгрузка отдается частями по мере чтения из базы.
+    """
+
+    format = None
+    content_type = None
+    chunk_rows = 100
+
+    def header(self):
+        return ''
+
+    def row(self, number, ingredient):
+        raise NotImplementedError
+
+    def footer(self):
+        return ''
+
+    def stream(self, ingredients):
+        """Генератор частей файла со списком покупок."""
+        yield self.header()
+        chunk = []
+        for number, ingredient in enumerate(ingredients, 1):
+            chunk.append(self.row(number, ingredient))
+            if len(chunk) == self.chunk_rows:
+                yield ''.join(chunk)
+                chunk = []
+        chunk.append(self.footer())
+        yield ''.join(chunk)
+
+    @property
+    def filename(self):
+        return f'shopping_cart.{self.format}'
+
+
+class TextExporter(ShoppingCartExporter):
+    format = 'txt'
+    content_type = 'text/plain; charset=utf-8'
+
+    def header(self):
+        return 'Список покупок:\n'
+
+    def row(self, number, ingredient):
+        return (f"{number}) {ingredient['ingredient__name']}"
+                f" ({ingredient['ingredient__measurement_unit']}) - "
+                f"{ingredient['ingredient_sum']} \n")
+
+
+class CsvExporter(ShoppingCartExporter):
+    format = 'csv'
+    content_type = 'text/csv; charset=utf-8'
+
+    class _Echo:
+        """Файлоподобный объект, возвращающий записанную строку."""
+
+        def write(self, value):
+            return value
+
+    def __init__(self):
+        self.writer = csv.writer(self._Echo())
+
+    def header(self):
+        return self.writer.writerow(('name', 'measurement_unit', 'amount'))
+
+    def row(self, number, ingredient):
+        return self.writer.writerow((
+            ingredient['ingredient__name'],
+            ingredient['ingredient__measurement_unit'],
+            ingredient['ingredient_sum']))
+
+
+class JsonExporter(ShoppingCartExporter):
+    format = 'json'
+    content_type = 'application/json'
+
+    def header(self):
+        return '['
+
+    def row(self, number, ingredient):
+        return ('' if number == 1 else ',') + json.dumps({
+            'name': ingredient['ingredient__name'],
+            'measurement_unit': ingredient['ingredient__measurement_unit'],
+            'amount': ingredient['ingredient_sum'],
+        }, ensure_ascii=False)
+
+    def footer(self):
+        return ']'
+
+
+EXPORTERS = {
+    exporter.format: exporter
+    for exporter in (TextExporter, CsvExporter, JsonExporter)
+}
+
+
+def get_exporter(format):
+    """Возвращает экспортер для формата из параметра запроса."""
+    try:
+        return EXPORTERS[format or TextExporter.format]()
+    except KeyError:
+        raise ValidationError(
+            f'Неизвестный формат {format}, доступны: '
+            f'{", ".join(EXPORTERS)}')
+
+
+class ExporterContentNegotiation(DefaultContentNegotiation):
+    """Параметр format выбирает экспортер, а не рендерер DRF."""
+
+    def select_renderer(self, request, renderers, format_suffix=None):
+        return renderers[0], renderers[0].media_type
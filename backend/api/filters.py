@@ -1,20 +1,63 @@
-from django_filters import AllValuesMultipleFilter
+from django import forms
+from django.db.models import Exists, OuterRef
 from django_filters.rest_framework import FilterSet, filters
+from rest_framework.filters import BaseFilterBackend
 
-from recipes.models import Ingredient, Recipe
+from recipes import fulltext
+from recipes.models import Recipe
+from recipes.tags import get_tag_ids
 
 
-class IngredientNameFilter(FilterSet):
-    name = filters.CharFilter(lookup_expr='istartswith')
+class MultipleValueField(forms.Field):
+    """Поле формы, принимающее все значения параметра запроса."""
 
-    class Meta:
-        model = Ingredient
-        fields = ('name',)
+    widget = forms.SelectMultiple
+
+    def to_python(self, value):
+        return [item for item in value or () if item]
+
+
+class TagsFilter(filters.Filter):
+    """Фильтр рецептов по слагам тегов.
+
+    Слаги переводятся в id через кешированный словарь тегов, а рецепты
+    отбираются подзапросом EXISTS без JOIN и без дублей.
+    """
+
+    field_class = MultipleValueField
+
+    def filter(self, queryset, value):
+        if not value:
+            return queryset
+        tag_ids = get_tag_ids(value)
+        if not tag_ids:
+            return queryset.none()
+        return queryset.filter(Exists(Recipe.tags.through.objects.filter(
+            recipe_id=OuterRef('pk'), tag_id__in=tag_ids)))
+
+
+class RecipeSearchFilter(BaseFilterBackend):
+    """Полнотекстовый поиск рецептов по параметру search.
+
+    Результаты сортируются по релевантности, если не передан параметр
+    ordering.
+    """
+
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '').strip()
+        if not query:
+            return queryset
+        queryset = fulltext.filter_queryset(queryset, query)
+        if ('search_rank' in queryset.query.annotations
+                and not request.query_params.get('ordering')):
+            queryset = queryset.order_by('-search_rank', '-pub_date', '-id')
+        return queryset
 
 
 class RecipeFilter(FilterSet):
-    tags = AllValuesMultipleFilter(
-        field_name='tags__slug')
+    tags = TagsFilter()
     is_favorited = filters.BooleanFilter(
         method='filter_is_favorited')
     is_in_shopping_cart = filters.BooleanFilter(
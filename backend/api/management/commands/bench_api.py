@@ -0,0 +1,159 @@
+import json
+import math
+import statistics
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.authtoken.models import Token
+
+from api.middleware import QueryRecorder
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+DEFAULT_BUDGET = Path(settings.BASE_DIR) / 'data' / 'bench_budget.json'
+
+
+def percentile(values, percent):
+    """Перцентиль по методу ближайшего ранга."""
+    values = sorted(values)
+    return values[max(math.ceil(len(values) * percent / 100) - 1, 0)]
+
+
+class Command(BaseCommand):
+    """Команда замеряющая задержку и число запросов горячих endpoint."""
+
+    help = ('Выполняет запросы к API тестовым клиентом на данных '
+            'seed_foodgram и сохраняет p50/p95 и число запросов к БД. '
+            'Завершается с ошибкой при превышении бюджета.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=30)
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс пользователей seed_foodgram.')
+        parser.add_argument('--output', type=Path,
+                            help='Файл для результатов в JSON.')
+        parser.add_argument(
+            '--budget', type=Path, default=DEFAULT_BUDGET,
+            help='JSON файл с предельными p50_ms, p95_ms и queries для '
+                 f'каждого endpoint, по умолчанию {DEFAULT_BUDGET}')
+        parser.add_argument(
+            '--no-budget', action='store_true',
+            help='Не проверять бюджет')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля')
+        budget = {}
+        if not options['no_budget']:
+            try:
+                budget = json.loads(options['budget'].read_text())
+            except (OSError, ValueError) as error:
+                raise CommandError(
+                    f'Не удалось прочитать {options["budget"]}: {error}')
+        user = User.objects.filter(
+            username__startswith=f'{options["prefix"]}_',
+            shopping_carts__isnull=False,
+            subscriber__isnull=False).order_by('pk').first()
+        if user is None:
+            raise CommandError('Нет данных, выполните seed_foodgram')
+        token, _ = Token.objects.get_or_create(user=user)
+
+        setup_test_environment()
+        try:
+            client = Client(HTTP_AUTHORIZATION=f'Token {token.key}')
+            results = {
+                name: self.measure(client, path, options)
+                for name, path in self.get_endpoints(user).items()}
+        finally:
+            teardown_test_environment()
+
+        report = {
+            'users': User.objects.count(),
+            'recipes': Recipe.objects.count(),
+            'repeat': options['repeat'],
+            'results': results,
+        }
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:28} {result["status"]} '
+                f'p50 {result["p50_ms"]:8.2f} мс  '
+                f'p95 {result["p95_ms"]:8.2f} мс  '
+                f'запросов {result["queries"]}')
+        if options['output']:
+            options['output'].write_text(
+                json.dumps(report, ensure_ascii=False, indent=2))
+        errors = self.check_budget(results, budget)
+        if errors:
+            raise CommandError(
+                'Превышен бюджет:\n' + '\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('Бюджет не превышен'))
+
+    def get_endpoints(self, user):
+        recipe = Recipe.objects.order_by('-favorites_count', 'pk').first()
+        tag = Tag.objects.order_by('pk').first()
+        ingredient = Ingredient.objects.order_by('pk').first()
+        return {
+            'recipes-list': '/api/recipes/',
+            'recipes-list-filtered':
+                f'/api/recipes/?tags={tag.slug}&is_favorited=1',
+            'recipes-list-cursor': '/api/recipes/?pagination=cursor',
+            'recipes-search': f'/api/recipes/?search={recipe.name}',
+            'recipe-detail': f'/api/recipes/{recipe.pk}/',
+            'recipes-feed': '/api/recipes/feed/',
+            'subscriptions': '/api/users/subscriptions/?recipes_limit=3',
+            'ingredient-search':
+                f'/api/ingredients/?name={ingredient.name[:2]}',
+            'shopping-cart-download':
+                '/api/recipes/download_shopping_cart/',
+        }
+
+    def measure(self, client, path, options):
+        for _ in range(options['warmup']):
+            self.request(client, path)
+        timings = []
+        queries = []
+        for _ in range(options['repeat']):
+            recorder = QueryRecorder(find_fields=False)
+            started = time.perf_counter()
+            with connections['default'].execute_wrapper(recorder):
+                response = self.request(client, path)
+            timings.append((time.perf_counter() - started) * 1000)
+            queries.append(recorder.count)
+        return {
+            'path': path,
+            'status': response.status_code,
+            'p50_ms': round(statistics.median(timings), 3),
+            'p95_ms': round(percentile(timings, 95), 3),
+            'mean_ms': round(statistics.mean(timings), 3),
+            'queries': max(queries),
+        }
+
+    def request(self, client, path):
+        response = client.get(path)
+        if response.streaming:
+            b''.join(response.streaming_content)
+        return response
+
+    def check_budget(self, results, budget):
+        errors = []
+        for name, limits in budget.items():
+            result = results.get(name)
+            if result is None:
+                errors.append(f'{name}: нет такого endpoint')
+                continue
+            if result['status'] != 200:
+                errors.append(f'{name}: статус {result["status"]}')
+            for key, limit in limits.items():
+                if key in result and result[key] > limit:
+                    errors.append(
+                        f'{name}: {key} {result[key]} больше {limit}')
+        return errors
@@ -0,0 +1,123 @@
+import heapq
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from foodgram_backend.constants import PAGE_SIZE
+from recipes.models import Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+class QueryCounter:
+    """Счетчик запросов к базе данных без их сохранения."""
+
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    """Команда сравнивающая ленту подписок с выборкой по авторам."""
+
+    help = ('Сравнивает ленту подписок одним запросом с последовательной '
+            'выборкой рецептов каждого автора. Тестовые данные '
+            'создаются в транзакции и откатываются.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--authors', type=int, default=10000)
+        parser.add_argument('--recipes', type=int, default=3,
+                            help='Рецептов у каждого автора.')
+        parser.add_argument('--pages', type=int, default=20)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            reader = self.create_data(options)
+            self.benchmark(reader, options)
+            transaction.set_rollback(True)
+
+    def create_data(self, options):
+        started = time.perf_counter()
+        batch_size = options['batch_size']
+        reader = User.objects.create(
+            email='bench_feed_reader@example.com',
+            username='bench_feed_reader')
+        authors = User.objects.bulk_create(
+            (User(email=f'bench_feed_{number}@example.com',
+                  username=f'bench_feed_{number}')
+             for number in range(options['authors'])),
+            batch_size=batch_size)
+        if not authors or authors[0].pk is None:
+            authors = list(User.objects.filter(
+                username__startswith='bench_feed_').exclude(pk=reader.pk))
+        Subscription.objects.bulk_create(
+            (Subscription(user=reader, subscribe=author)
+             for author in authors),
+            batch_size=batch_size)
+        now = timezone.now()
+        Recipe.objects.bulk_create(
+            (Recipe(author=author, name=f'bench {author.pk}-{number}',
+                    text='bench', cooking_time=1, image='recipes/bench.png',
+                    pub_date=now - timezone.timedelta(
+                        minutes=author.pk * options['recipes'] + number))
+             for author in authors for number in range(options['recipes'])),
+            batch_size=batch_size)
+        self.stdout.write(
+            f'Авторов: {len(authors)}, рецептов: '
+            f'{len(authors) * options["recipes"]}, подготовка '
+            f'{time.perf_counter() - started:.1f} с')
+        return reader
+
+    def benchmark(self, reader, options):
+        queryset = Recipe.objects.feed(reader).order_by('-pub_date', '-id')
+        self.stdout.write(queryset[:PAGE_SIZE].explain())
+
+        timings = []
+        last = None
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            for _ in range(options['pages']):
+                started = time.perf_counter()
+                page = queryset
+                if last is not None:
+                    page = page.filter(pub_date__lt=last.pub_date)
+                page = list(page[:PAGE_SIZE])
+                timings.append(time.perf_counter() - started)
+                if not page:
+                    break
+                last = page[-1]
+        self.report('Лента одним запросом', timings, queries.count)
+
+        started = time.perf_counter()
+        queries = QueryCounter()
+        with connection.execute_wrapper(queries):
+            author_ids = Subscription.objects.filter(
+                user=reader).values_list('subscribe_id', flat=True)
+            recipes = heapq.nlargest(
+                PAGE_SIZE,
+                (recipe for author_id in author_ids
+                 for recipe in Recipe.objects.filter(
+                     author_id=author_id).order_by('-pub_date')[:PAGE_SIZE]),
+                key=lambda recipe: recipe.pub_date)
+        self.report('Выборка по авторам (первая страница)',
+                    [time.perf_counter() - started], queries.count)
+        if recipes and recipes[0].pk == queryset.first().pk:
+            self.stdout.write(self.style.SUCCESS('Первые рецепты совпадают'))
+        else:
+            self.stdout.write(self.style.ERROR('Первые рецепты различаются'))
+
+    def report(self, title, timings, queries):
+        timings = sorted(timings)
+        self.stdout.write(
+            f'{title}: страниц {len(timings)}, запросов {queries}, '
+            f'медиана {statistics.median(timings) * 1000:.2f} мс, '
+            f'максимум {timings[-1] * 1000:.2f} мс')
@@ -0,0 +1,55 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import Ingredient
+from recipes.search import IngredientSearchIndex
+
+
+class Command(BaseCommand):
+    """Команда сравнивающая поиск ингредиентов по индексу и через ORM."""
+
+    help = 'Сравнивает поиск ингредиентов по индексу в памяти и через ORM.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--queries', type=int, default=1000)
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--limit', type=int, default=None)
+
+    def handle(self, *args, **options):
+        names = list(Ingredient.objects.values_list('name', flat=True))
+        if not names:
+            raise CommandError(
+                'Ингредиенты не загружены, выполните load_ingredients')
+        generator = random.Random(options['seed'])
+        queries = []
+        for _ in range(options['queries']):
+            name = generator.choice(names)
+            queries.append(name[:generator.randint(1, min(len(name), 4))])
+
+        index = IngredientSearchIndex()
+        started = time.perf_counter()
+        index.search('')
+        build_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for query in queries:
+            index.search(query, limit=options['limit'])
+        index_time = time.perf_counter() - started
+
+        started = time.perf_counter()
+        for query in queries:
+            list(Ingredient.objects.filter(
+                name__istartswith=query).values(
+                    'id', 'name', 'measurement_unit'))
+        orm_time = time.perf_counter() - started
+
+        count = len(queries)
+        self.stdout.write(f'Ингредиентов: {len(names)}, запросов: {count}')
+        self.stdout.write(f'Построение индекса: {build_time * 1000:.2f} мс')
+        self.stdout.write(
+            f'Индекс: {index_time / count * 1e6:.1f} мкс на запрос')
+        self.stdout.write(f'ORM: {orm_time / count * 1e6:.1f} мкс на запрос')
+        self.stdout.write(self.style.SUCCESS(
+            f'Ускорение: {orm_time / index_time:.1f}x'))
@@ -0,0 +1,140 @@
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db.models import Count, OuterRef, Prefetch, Subquery, Value
+from django.test import RequestFactory
+from django.test.utils import (setup_test_environment,
+                               teardown_test_environment)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+
+from api import representations
+from api.renderers import FastJSONRenderer
+from api.serializers import CustomUserFullSerializer, RecipeSerializer
+from recipes.models import Recipe
+from recipes.search import ingredient_index
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    """Команда сравнивающая сериализаторы DRF с построением из values()."""
+
+    help = ('Проверяет побайтовое совпадение ответов списков рецептов, '
+            'подписок и ингредиентов, построенных сериализаторами DRF и '
+            'из строк values(), и замеряет процессорное время обоих '
+            'способов на данных seed_foodgram.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Рецептов в одном ответе.')
+        parser.add_argument('--authors', type=int, default=50,
+                            help='Авторов в ответе подписок.')
+        parser.add_argument('--recipes-limit', type=int, default=3)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс пользователей seed_foodgram.')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat должен быть больше нуля')
+        user = User.objects.filter(
+            username__startswith=f'{options["prefix"]}_',
+            subscriber__isnull=False).order_by('pk').first()
+        if user is None:
+            raise CommandError('Нет данных, выполните seed_foodgram')
+        setup_test_environment()
+        try:
+            request = Request(RequestFactory().get('/api/'))
+            request.user = user
+            cases = self.get_cases(request, options)
+            errors = []
+            for name, (serializers, fast) in cases.items():
+                expected, actual = serializers(), fast()
+                if expected != actual:
+                    errors.append(self.describe_mismatch(
+                        name, expected, actual))
+                    continue
+                serializers_time = self.measure(serializers, options)
+                fast_time = self.measure(fast, options)
+                self.stdout.write(
+                    f'{name:14} {len(expected):9} байт  '
+                    f'DRF {serializers_time:8.2f} мс  '
+                    f'values() {fast_time:8.2f} мс  '
+                    f'x{serializers_time / fast_time:.1f}')
+        finally:
+            teardown_test_environment()
+        if errors:
+            raise CommandError('\n'.join(errors))
+        self.stdout.write(self.style.SUCCESS('Ответы совпадают побайтово'))
+
+    def get_cases(self, request, options):
+        user = request.user
+        pks = list(Recipe.objects.order_by('-pub_date', '-id').values_list(
+            'pk', flat=True)[:options['recipes']])
+        recipes = Recipe.objects.filter(
+            pk__in=pks).with_user_flags(user).order_by('-pub_date', '-id')
+        authors = User.objects.filter(subscribe__user=user).annotate(
+            recipes_count=Count('recipes')).order_by('username')
+        author_recipes = Recipe.objects.filter(pk__in=Subquery(
+            Recipe.objects.filter(author=OuterRef('author')).values(
+                'pk')[:options['recipes_limit']]))
+
+        def recipes_serializers():
+            return JSONRenderer().render(RecipeSerializer(
+                recipes.with_related(), many=True,
+                context={'request': request}).data)
+
+        def recipes_fast():
+            data = representations.get_recipes(pks, request)
+            results = []
+            for row in recipes.values(
+                    'id', 'is_favorited', 'is_in_shopping_cart'):
+                recipe = data[row['id']]
+                recipe['is_favorited'] = row['is_favorited']
+                recipe['is_in_shopping_cart'] = row['is_in_shopping_cart']
+                results.append(recipe)
+            return FastJSONRenderer().render(results)
+
+        def subscriptions_serializers():
+            return JSONRenderer().render(CustomUserFullSerializer(
+                authors.annotate(is_subscribed=Value(True)).prefetch_related(
+                    Prefetch('recipes', queryset=author_recipes,
+                             to_attr='limited_recipes')
+                )[:options['authors']],
+                many=True, context={'request': request}).data)
+
+        def subscriptions_fast():
+            return FastJSONRenderer().render(
+                representations.get_subscriptions(
+                    authors.values(
+                        *representations.USER_FIELDS, 'recipes_count'
+                    )[:options['authors']],
+                    author_recipes))
+
+        ingredients = ingredient_index.search('')
+        return {
+            'recipes': (recipes_serializers, recipes_fast),
+            'subscriptions': (subscriptions_serializers, subscriptions_fast),
+            'ingredients': (
+                lambda: JSONRenderer().render(ingredients),
+                lambda: FastJSONRenderer().render(ingredients)),
+        }
+
+    def measure(self, function, options):
+        """Среднее процессорное время вызова в миллисекундах."""
+        started = time.process_time()
+        for _ in range(options['repeat']):
+            function()
+        return (time.process_time() - started) * 1000 / options['repeat']
+
+    def describe_mismatch(self, name, expected, actual):
+        position = next(
+            (index for index, (left, right) in enumerate(
+                zip(expected, actual)) if left != right),
+            min(len(expected), len(actual)))
+        start, end = max(position - 40, 0), position + 80
+        return (f'{name}: ответы различаются с байта {position}:\n'
+                f'  DRF:      {expected[start:end]!r}\n'
+                f'  values(): {actual[start:end]!r}')
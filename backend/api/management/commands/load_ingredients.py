@@ -1,17 +1,126 @@
 import csv
+import json
+import time
+from itertools import islice
+from pathlib import Path
 
-from django.core.management.base import BaseCommand
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
 
-from recipes.models import Ingredient
+from recipes import versions
+from recipes.models import Ingredient, add_ingredients
+from recipes.search import ingredient_index
+
+DEFAULT_PATH = Path(settings.BASE_DIR) / 'data' / 'ingredients.csv'
+CHUNK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for row in csv.reader(file):
+        if len(row) >= 2:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    """Читает массив объектов JSON частями по CHUNK_SIZE символов.
+
+    В памяти держится только недочитанный объект, а не весь файл.
+    """
+    decoder = json.JSONDecoder()
+    buffer, expected = '', '['
+    for chunk in iter(lambda: file.read(CHUNK_SIZE), ''):
+        buffer += chunk
+        while buffer := buffer.lstrip():
+            if expected == 'value':
+                try:
+                    row, end = decoder.raw_decode(buffer)
+                except ValueError:
+                    # Объект не дочитан, ждем следующую часть файла.
+                    break
+                buffer, expected = buffer[end:], ','
+                yield row['name'], row['measurement_unit']
+            elif expected in ('first', ',') and buffer[0] == ']':
+                buffer, expected = buffer[1:], 'end'
+            elif expected == 'first':
+                expected = 'value'
+            elif expected != 'end' and buffer[0] == expected:
+                buffer = buffer[1:]
+                expected = 'first' if expected == '[' else 'value'
+            else:
+                raise ValueError(f'неожиданный символ {buffer[0]!r}')
+    if expected != 'end':
+        raise ValueError('массив JSON не закончен')
+
+
+def read_jsonl(file):
+    for line in file:
+        if line.strip():
+            row = json.loads(line)
+            yield row['name'], row['measurement_unit']
+
+
+READERS = {'csv': read_csv, 'json': read_json, 'jsonl': read_jsonl}
+
+
+def batches(rows, size):
+    rows = iter(rows)
+    while batch := list(islice(rows, size)):
+        yield batch
 
 
 class Command(BaseCommand):
-    """Команда загружающая в БД ингредиенты из csv файла в папке data."""
-
-    def handle(self, *args, **kwargs):
-        with open('data/ingredients.csv',
-                  'r', encoding='UTF-8') as ingredients:
-            reader = csv.reader(ingredients)
-            for row in reader:
-                Ingredient.objects.get_or_create(
-                    name=row[0], measurement_unit=row[1])
+    """Команда загружающая в БД ингредиенты из csv, json или jsonl файла."""
+
+    help = ('Загружает ингредиенты из csv, json или jsonl файла пачками, '
+            'пропуская уже существующие.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'path', nargs='?', default=DEFAULT_PATH, type=Path,
+            help=f'Путь к файлу, по умолчанию {DEFAULT_PATH}')
+        parser.add_argument(
+            '--format', choices=READERS,
+            help='Формат файла, по умолчанию определяется по расширению')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только посчитать новые ингредиенты, не записывая их')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        if file_format not in READERS:
+            raise CommandError(f'Неизвестный формат файла {path}')
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля')
+        started = time.perf_counter()
+        existing = set(Ingredient.objects.values_list(
+            'name', 'measurement_unit'))
+        total = created = 0
+        try:
+            with open(path, 'r', encoding='UTF-8') as file:
+                for batch in batches(
+                        READERS[file_format](file), options['batch_size']):
+                    total += len(batch)
+                    ingredients = []
+                    for name, measurement_unit in batch:
+                        key = (name.strip(), measurement_unit.strip())
+                        if key not in existing:
+                            existing.add(key)
+                            ingredients.append(key)
+                    if options['dry_run']:
+                        created += len(ingredients)
+                    else:
+                        created += add_ingredients(ingredients)
+        except (OSError, ValueError, KeyError, TypeError) as error:
+            raise CommandError(f'Не удалось прочитать {path}: {error}')
+        if created and not options['dry_run']:
+            # INSERT не отправляет сигналы, а индекс и ETag других
+            # процессов сверяются с версией каталога.
+            versions.bump(versions.INGREDIENTS)
+            ingredient_index.invalidate()
+        elapsed = time.perf_counter() - started
+        action = 'будет добавлено' if options['dry_run'] else 'добавлено'
+        self.stdout.write(self.style.SUCCESS(
+            f'Прочитано строк: {total}, {action} ингредиентов: {created} '
+            f'за {elapsed:.2f} с ({total / elapsed:.0f} строк/с)'))
@@ -1,4 +1,6 @@
 from django.core.management.base import BaseCommand
+from django.db import IntegrityError, transaction
+from django.db.models import Q
 
 from recipes.models import Tag
 
@@ -13,8 +15,27 @@ class Command(BaseCommand):
     """Команда создающая в базе данных несколько тегов для рецептов."""
 
     def handle(self, *args, **kwargs):
-        for tag in TAG_DATA:
-            Tag.objects.create(**tag)
+        already_loaded = True
+        for data in TAG_DATA:
+            try:
+                with transaction.atomic():
+                    Tag.objects.create(**data)
+            except IntegrityError:
+                # Тот же тег уже загружен, а тег с совпадающим названием,
+                # цветом или слагом, но другими полями - конфликт.
+                conflicts = Tag.objects.filter(
+                    Q(name=data['name']) | Q(color=data['color'])
+                    | Q(slug=data['slug'])).exclude(**data)
+                if conflicts:
+                    already_loaded = False
+                    self.stdout.write(self.style.WARNING(
+                        f'Тэг {data["name"]} не добавлен, конфликтует с '
+                        + ', '.join(f'{tag.name} ({tag.slug}, {tag.color})'
+                                    for tag in conflicts)))
+                continue
+            already_loaded = False
             self.stdout.write(
-                self.style.SUCCESS(f'Тэг {tag} успешно добавлен')
+                self.style.SUCCESS(f'Тэг {data["name"]} успешно добавлен')
             )
+        if already_loaded:
+            self.stdout.write('Все тэги уже загружены')
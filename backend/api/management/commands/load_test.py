@@ -0,0 +1,112 @@
+import json
+import statistics
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.error import HTTPError, URLError
+from urllib.parse import quote
+from urllib.request import Request, urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+from .bench_api import percentile
+
+DEFAULT_PATHS = (
+    '/api/recipes/',
+    '/api/recipes/?pagination=cursor',
+    '/api/ingredients/?name=мо',
+)
+
+
+class Command(BaseCommand):
+    """Команда нагрузочного теста запущенного сервера."""
+
+    help = ('Отправляет запросы к запущенному серверу параллельными '
+            'клиентами и измеряет пропускную способность и задержку. '
+            'Несколько --url позволяют сравнить WSGI и ASGI режимы '
+            'с одинаковым числом воркеров.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--url', action='append',
+            help='Адрес сервера, можно указать несколько раз, по '
+                 'умолчанию http://127.0.0.1:8000')
+        parser.add_argument(
+            '--path', action='append',
+            help='Путь запроса, можно указать несколько раз')
+        parser.add_argument('--concurrency', type=int, default=50)
+        parser.add_argument('--requests', type=int, default=1000)
+        parser.add_argument('--token', help='Токен пользователя.')
+        parser.add_argument(
+            '--read-delay', type=float, default=0,
+            help='Пауза в секундах между чтением частей ответа по 1 КБ, '
+                 'имитирует медленных клиентов.')
+        parser.add_argument('--timeout', type=float, default=30)
+        parser.add_argument('--output', type=Path,
+                            help='Файл для результатов в JSON.')
+
+    def handle(self, *args, **options):
+        if options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError(
+                '--concurrency и --requests должны быть больше нуля')
+        paths = options['path'] or DEFAULT_PATHS
+        results = {}
+        for url in options['url'] or ['http://127.0.0.1:8000']:
+            results[url] = self.run(url.rstrip('/'), paths, options)
+            self.report(url, results[url])
+        if len(results) > 1:
+            base, *others = results.values()
+            for url, result in zip(list(results)[1:], others):
+                self.stdout.write(self.style.SUCCESS(
+                    f'{url}: пропускная способность '
+                    f'{result["rps"] / base["rps"]:.2f}x от первого'))
+        if options['output']:
+            options['output'].write_text(
+                json.dumps(results, ensure_ascii=False, indent=2))
+
+    def run(self, url, paths, options):
+        headers = {}
+        if options['token']:
+            headers['Authorization'] = f'Token {options["token"]}'
+        requests = [
+            Request(url + quote(paths[number % len(paths)], safe='/?=&'),
+                    headers=headers)
+            for number in range(options['requests'])]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(options['concurrency']) as executor:
+            responses = list(executor.map(
+                lambda request: self.fetch(request, options), requests))
+        elapsed = time.perf_counter() - started
+        timings = [timing for _, timing in responses]
+        return {
+            'requests': len(responses),
+            'concurrency': options['concurrency'],
+            'seconds': round(elapsed, 3),
+            'rps': round(len(responses) / elapsed, 1),
+            'p50_ms': round(statistics.median(timings), 2),
+            'p95_ms': round(percentile(timings, 95), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'statuses': dict(Counter(status for status, _ in responses)),
+        }
+
+    def fetch(self, request, options):
+        started = time.perf_counter()
+        try:
+            with urlopen(request, timeout=options['timeout']) as response:
+                status = response.status
+                while response.read(1024):
+                    if options['read_delay']:
+                        time.sleep(options['read_delay'])
+        except HTTPError as error:
+            status = error.code
+        except (URLError, OSError) as error:
+            status = type(error).__name__
+        return status, (time.perf_counter() - started) * 1000
+
+    def report(self, url, result):
+        self.stdout.write(
+            f'{url}: {result["requests"]} запросов за '
+            f'{result["seconds"]} с, {result["rps"]} запросов/с, '
+            f'p50 {result["p50_ms"]} мс, p95 {result["p95_ms"]} мс, '
+            f'p99 {result["p99_ms"]} мс, статусы {result["statuses"]}')
@@ -0,0 +1,71 @@
+import shlex
+import statistics
+import subprocess
+import time
+from urllib.error import HTTPError, URLError
+from urllib.request import urlopen
+
+from django.core.management.base import BaseCommand, CommandError
+
+DEFAULT_COMMAND = 'gunicorn -c gunicorn.conf.py'
+DEFAULT_URL = 'http://127.0.0.1:8000/api/recipes/'
+
+
+class Command(BaseCommand):
+    """Команда измеряющая время от запуска сервера до первого ответа."""
+
+    help = ('Запускает сервер, опрашивает адрес до первого ответа и '
+            'печатает время до первого ответа и длительность этого '
+            'запроса.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--command', default=DEFAULT_COMMAND,
+            help=f'Команда запуска сервера, по умолчанию {DEFAULT_COMMAND}')
+        parser.add_argument('--url', default=DEFAULT_URL)
+        parser.add_argument('--runs', type=int, default=3)
+        parser.add_argument('--timeout', type=float, default=60)
+        parser.add_argument('--interval', type=float, default=0.05)
+
+    def handle(self, *args, **options):
+        results = []
+        for run in range(1, options['runs'] + 1):
+            first_response, request_time = self.measure(options)
+            results.append(first_response)
+            self.stdout.write(
+                f'Запуск {run}: первый ответ через {first_response:.3f} с, '
+                f'запрос {request_time * 1000:.1f} мс')
+        if results:
+            self.stdout.write(self.style.SUCCESS(
+                f'Медиана времени до первого ответа: '
+                f'{statistics.median(results):.3f} с'))
+
+    def measure(self, options):
+        started = time.monotonic()
+        process = subprocess.Popen(
+            shlex.split(options['command']),
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        try:
+            while time.monotonic() - started < options['timeout']:
+                if process.poll() is not None:
+                    raise CommandError(
+                        f'Сервер завершился с кодом {process.returncode}')
+                request_started = time.monotonic()
+                try:
+                    with urlopen(options['url'], timeout=options['timeout']):
+                        pass
+                except HTTPError:
+                    pass
+                except (URLError, OSError):
+                    time.sleep(options['interval'])
+                    continue
+                now = time.monotonic()
+                return now - started, now - request_started
+            raise CommandError('Сервер не ответил за отведенное время')
+        finally:
+            process.terminate()
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from recipes import fulltext
+
+
+class Command(BaseCommand):
+    """Команда пересобирающая полнотекстовый индекс рецептов."""
+
+    help = 'Пересобирает полнотекстовый индекс рецептов.'
+
+    def handle(self, *args, **options):
+        fulltext.update_index()
+        self.stdout.write(self.style.SUCCESS('Поисковый индекс пересобран'))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes import shopping_list
+
+
+class Command(BaseCommand):
+    """Команда пересобирающая материализованные списки покупок."""
+
+    help = ('Пересобирает таблицу списков покупок по корзинам пользователей '
+            'или проверяет ее согласованность (--check).')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user', type=int, action='append', dest='user_ids',
+            help='id пользователя, можно указать несколько раз')
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Только сравнить таблицу с агрегацией на лету')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            differences = shopping_list.find_inconsistencies(
+                options['user_ids'])
+            for user_id, ingredient_id, stored, expected in differences:
+                self.stdout.write(
+                    f'Пользователь {user_id}, ингредиент {ingredient_id}: '
+                    f'сохранено {stored}, ожидается {expected}')
+            if differences:
+                raise CommandError(
+                    f'Найдено расхождений: {len(differences)}')
+            self.stdout.write(self.style.SUCCESS('Расхождений нет'))
+            return
+        count = shopping_list.rebuild(options['user_ids'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок пересобраны, записей: {count}'))
@@ -0,0 +1,47 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+def count_for_recipe(model):
+    return Coalesce(Subquery(
+        model.objects.filter(recipe=OuterRef('pk')).values('recipe').annotate(
+            total=Count('pk')).values('total')), 0)
+
+
+class Command(BaseCommand):
+    """Команда исправляющая счетчики избранного и списков покупок."""
+
+    help = ('Пересчитывает favorites_count и in_carts_count у рецептов, '
+            'значения которых разошлись с таблицами.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Только показать рецепты с расхождениями')
+
+    def handle(self, *args, **options):
+        drifted = Recipe.objects.annotate(
+            actual_favorites=count_for_recipe(Favorite),
+            actual_in_carts=count_for_recipe(ShoppingCart)
+        ).filter(
+            ~Q(favorites_count=F('actual_favorites'))
+            | ~Q(in_carts_count=F('actual_in_carts'))
+        ).only('pk', 'favorites_count', 'in_carts_count')
+        recipes = []
+        for recipe in drifted:
+            self.stdout.write(
+                f'Рецепт {recipe.pk}: избранное {recipe.favorites_count} -> '
+                f'{recipe.actual_favorites}, списки покупок '
+                f'{recipe.in_carts_count} -> {recipe.actual_in_carts}')
+            recipe.favorites_count = recipe.actual_favorites
+            recipe.in_carts_count = recipe.actual_in_carts
+            recipes.append(recipe)
+        if recipes and not options['dry_run']:
+            Recipe.objects.bulk_update(
+                recipes, ('favorites_count', 'in_carts_count'),
+                batch_size=1000)
+        self.stdout.write(self.style.SUCCESS(
+            f'Рецептов с расхождениями: {len(recipes)}'))
@@ -0,0 +1,169 @@
+import io
+import random
+import time
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from PIL import Image
+
+from recipes import fulltext, shopping_list, versions
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Subscription
+from .load_ingredients import batches
+
+User = get_user_model()
+
+IMAGE_NAME = 'api/media/seed.png'
+
+
+class Command(BaseCommand):
+    """Команда заполняющая БД синтетическими данными."""
+
+    help = ('Создает пользователей, рецепты, избранное, списки покупок и '
+            'подписки через bulk_create. При одинаковом --seed и '
+            'справочниках результат совпадает.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--recipes', type=int, default=1000)
+        parser.add_argument(
+            '--ingredients-per-recipe', type=int, default=8)
+        parser.add_argument('--tags-per-recipe', type=int, default=2)
+        parser.add_argument(
+            '--favorites', type=int, default=20,
+            help='Избранных рецептов у каждого пользователя.')
+        parser.add_argument(
+            '--carts', type=int, default=5,
+            help='Рецептов в списке покупок у каждого пользователя.')
+        parser.add_argument(
+            '--subscriptions', type=int, default=10,
+            help='Подписок у каждого пользователя.')
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument('--prefix', default='seed')
+        parser.add_argument('--password', default='seed-password')
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument(
+            '--clear', action='store_true',
+            help='Удалить ранее созданных пользователей с тем же префиксом')
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        existing = User.objects.filter(username__startswith=f'{prefix}_')
+        if options['clear']:
+            deleted, _ = existing.delete()
+            self.stdout.write(f'Удалено объектов: {deleted}')
+        elif existing.exists():
+            raise CommandError(
+                f'Пользователи с префиксом {prefix} уже есть, '
+                'используйте --clear')
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True))
+        tag_ids = list(Tag.objects.order_by('pk').values_list('pk', flat=True))
+        if not ingredient_ids or not tag_ids:
+            raise CommandError(
+                'Справочники пусты, выполните load_ingredients и load_tags')
+        if options['users'] < 1:
+            raise CommandError('--users должен быть больше нуля')
+
+        started = time.perf_counter()
+        self.generator = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        with transaction.atomic():
+            user_ids = self.create_users(options)
+            recipe_ids = self.create_recipes(
+                options, user_ids, ingredient_ids, tag_ids)
+            counts = self.create_relations(options, user_ids, recipe_ids)
+            self.update_derived_data(user_ids, recipe_ids)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'Пользователей: {len(user_ids)}, рецептов: {len(recipe_ids)}, '
+            f'избранного: {counts[0]}, списков покупок: {counts[1]}, '
+            f'подписок: {counts[2]} за {elapsed:.1f} с'))
+
+    def create_users(self, options):
+        prefix = options['prefix']
+        password = make_password(options['password'])
+        User.objects.bulk_create(
+            (User(email=f'{prefix}_{number}@example.com',
+                  username=f'{prefix}_{number}',
+                  first_name='Имя', last_name=f'Фамилия {number}',
+                  password=password)
+             for number in range(options['users'])),
+            batch_size=self.batch_size)
+        return list(User.objects.filter(
+            username__startswith=f'{prefix}_').order_by(
+                'pk').values_list('pk', flat=True))
+
+    def create_recipes(self, options, user_ids, ingredient_ids, tag_ids):
+        if not default_storage.exists(IMAGE_NAME):
+            buffer = io.BytesIO()
+            Image.new('RGB', (480, 360), 'orange').save(buffer, 'PNG')
+            default_storage.save(IMAGE_NAME, ContentFile(buffer.getvalue()))
+        generator = self.generator
+        Recipe.objects.bulk_create(
+            (Recipe(author_id=generator.choice(user_ids),
+                    name=f'Рецепт {number}',
+                    text=f'Описание синтетического рецепта {number}',
+                    cooking_time=generator.randint(1, 180),
+                    image=IMAGE_NAME)
+             for number in range(options['recipes'])),
+            batch_size=self.batch_size)
+        recipe_ids = list(Recipe.objects.filter(
+            author__in=user_ids).order_by('pk').values_list('pk', flat=True))
+        ingredients_count = min(
+            options['ingredients_per_recipe'], len(ingredient_ids))
+        tags_count = min(options['tags_per_recipe'], len(tag_ids))
+        RecipeIngredient.objects.bulk_create(
+            (RecipeIngredient(recipe_id=recipe_id, ingredient_id=ingredient_id,
+                              amount=generator.randint(1, 500))
+             for recipe_id in recipe_ids
+             for ingredient_id in generator.sample(
+                 ingredient_ids, ingredients_count)),
+            batch_size=self.batch_size)
+        Recipe.tags.through.objects.bulk_create(
+            (Recipe.tags.through(recipe_id=recipe_id, tag_id=tag_id)
+             for recipe_id in recipe_ids
+             for tag_id in generator.sample(tag_ids, tags_count)),
+            batch_size=self.batch_size)
+        return recipe_ids
+
+    def create_relations(self, options, user_ids, recipe_ids):
+        generator = self.generator
+        counts = []
+        for model, per_user in ((Favorite, options['favorites']),
+                                (ShoppingCart, options['carts'])):
+            objects = [
+                model(user_id=user_id, recipe_id=recipe_id)
+                for user_id in user_ids
+                for recipe_id in generator.sample(
+                    recipe_ids, min(per_user, len(recipe_ids)))]
+            model.objects.bulk_create(objects, batch_size=self.batch_size)
+            counts.append(len(objects))
+        subscriptions = []
+        for user_id in user_ids:
+            authors = [pk for pk in user_ids if pk != user_id]
+            subscriptions += [
+                Subscription(user_id=user_id, subscribe_id=author_id)
+                for author_id in generator.sample(
+                    authors, min(options['subscriptions'], len(authors)))]
+        Subscription.objects.bulk_create(
+            subscriptions, batch_size=self.batch_size)
+        counts.append(len(subscriptions))
+        return counts
+
+    def update_derived_data(self, user_ids, recipe_ids):
+        """bulk_create не вызывает сигналы, поэтому счетчики, списки
+        покупок, поисковый индекс и версии данных обновляются здесь."""
+        call_command('reconcile_recipe_counters', stdout=io.StringIO())
+        for batch in batches(user_ids, self.batch_size):
+            shopping_list.rebuild(batch)
+        for batch in batches(recipe_ids, self.batch_size):
+            fulltext.update_index(batch)
+        for key in (versions.RECIPES, versions.USERS, versions.AUTHORS):
+            versions.bump(key)
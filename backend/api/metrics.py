@@ -0,0 +1,284 @@
+import copy
+import fcntl
+import json
+import os
+import threading
+import time
+from collections import defaultdict
+from glob import glob
+from itertools import accumulate
+
+from django.conf import settings
+
+from . import authentication, cache
+
+DURATION_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERY_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 200, 500)
+# Воркер сохраняет свои метрики в METRICS_DIR не чаще раза в секунду.
+FLUSH_INTERVAL = 1
+ARCHIVE = 'archive.json'
+
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_last_flush = 0
+
+startup = {}
+
+
+class Histogram:
+    """Гистограмма в формате Prometheus с меткой endpoint."""
+
+    def __init__(self, name, description, buckets):
+        self.name = name
+        self.description = description
+        self.buckets = buckets
+        self.values = defaultdict(
+            lambda: {'buckets': [0] * len(buckets), 'sum': 0, 'count': 0})
+
+    def observe(self, endpoint, value):
+        data = self.values[endpoint]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                data['buckets'][index] += 1
+                break
+        data['sum'] += value
+        data['count'] += 1
+
+    def snapshot(self):
+        return {endpoint: {'buckets': list(data['buckets']),
+                           'sum': data['sum'], 'count': data['count']}
+                for endpoint, data in self.values.items()}
+
+    def merge(self, values):
+        for endpoint, data in values.items():
+            total = self.values[endpoint]
+            total['buckets'] = [
+                count + other
+                for count, other in zip(total['buckets'], data['buckets'])]
+            total['sum'] += data['sum']
+            total['count'] += data['count']
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} histogram']
+        for endpoint, data in sorted(self.values.items()):
+            label = f'endpoint="{escape(endpoint)}"'
+            for bound, count in zip(
+                    self.buckets, accumulate(data['buckets'])):
+                lines.append(
+                    f'{self.name}_bucket{{{label},le="{bound}"}} {count}')
+            lines.append(
+                f'{self.name}_bucket{{{label},le="+Inf"}} {data["count"]}')
+            lines.append(f'{self.name}_sum{{{label}}} {data["sum"]}')
+            lines.append(f'{self.name}_count{{{label}}} {data["count"]}')
+        return lines
+
+
+class Counter:
+    """Счетчик в формате Prometheus с меткой endpoint."""
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.values = defaultdict(int)
+
+    def inc(self, endpoint, value=1):
+        self.values[endpoint] += value
+
+    def snapshot(self):
+        return dict(self.values)
+
+    def merge(self, values):
+        for endpoint, value in values.items():
+            self.values[endpoint] += value
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}',
+                 f'# TYPE {self.name} counter']
+        lines += [f'{self.name}{{endpoint="{escape(endpoint)}"}} {value}'
+                  for endpoint, value in sorted(self.values.items())]
+        return lines
+
+
+request_duration = Histogram(
+    'foodgram_request_duration_seconds',
+    'Время обработки запроса.', DURATION_BUCKETS)
+db_duration = Histogram(
+    'foodgram_db_duration_seconds',
+    'Время запросов к базе данных за запрос.', DURATION_BUCKETS)
+db_queries = Histogram(
+    'foodgram_db_queries', 'Число запросов к базе данных за запрос.',
+    QUERY_BUCKETS)
+repeated_queries = Histogram(
+    'foodgram_db_repeated_queries',
+    'Наибольшее число повторов одного шаблона запроса за запрос.',
+    QUERY_BUCKETS)
+n_plus_one = Counter(
+    'foodgram_n_plus_one_requests_total',
+    'Запросы, в которых шаблон запроса повторился больше порога.')
+REGISTRY = (request_duration, db_duration, db_queries, repeated_queries,
+            n_plus_one)
+
+
+def escape(value):
+    return (value.replace('\\', '\\\\').replace('"', '\\"')
+            .replace('\n', '\\n'))
+
+
+def observe(endpoint, duration, db_time, queries, max_repeats,
+            repeat_threshold):
+    """Учитывает метрики одного запроса к endpoint."""
+    with _lock:
+        request_duration.observe(endpoint, duration)
+        db_duration.observe(endpoint, db_time)
+        db_queries.observe(endpoint, queries)
+        repeated_queries.observe(endpoint, max_repeats)
+        if max_repeats > repeat_threshold:
+            n_plus_one.inc(endpoint)
+    if (settings.METRICS_DIR
+            and time.monotonic() - _last_flush >= FLUSH_INTERVAL
+            and _flush_lock.acquire(blocking=False)):
+        try:
+            flush()
+        finally:
+            _flush_lock.release()
+
+
+def get_gauges():
+    """Возвращает показатели кешей и запуска этого процесса."""
+    return {
+        'foodgram_response_cache': cache.get_stats(),
+        'foodgram_auth_token_cache': authentication.get_stats(),
+        'foodgram_startup_seconds': dict(startup),
+    }
+
+
+def snapshot():
+    with _lock:
+        values = {metric.name: metric.snapshot() for metric in REGISTRY}
+    return {'metrics': values, 'gauges': get_gauges()}
+
+
+def combine(snapshots):
+    """Суммирует снимки метрик нескольких процессов."""
+    combined = []
+    for metric in REGISTRY:
+        total = copy.copy(metric)
+        total.values = defaultdict(metric.values.default_factory)
+        for values in snapshots:
+            total.merge(values.get(metric.name, {}))
+        combined.append(total)
+    return combined
+
+
+def read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def write(path, data):
+    temporary = f'{path}.{os.getpid()}.tmp'
+    with open(temporary, 'w') as file:
+        json.dump(data, file)
+    os.replace(temporary, path)
+
+
+def flush():
+    """Сохраняет метрики процесса в METRICS_DIR."""
+    global _last_flush
+    if not settings.METRICS_DIR:
+        return
+    _last_flush = time.monotonic()
+    write(os.path.join(settings.METRICS_DIR, f'{os.getpid()}.json'),
+          snapshot())
+
+
+def is_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def collect():
+    """Возвращает архив завершенных воркеров и снимки работающих.
+
+    Счетчики завершенных воркеров, например перезапущенных после
+    max_requests, сливаются в архив, чтобы сумма по воркерам не
+    уменьшалась и rate() не видел ложных сбросов.
+    """
+    directory = settings.METRICS_DIR
+    with open(os.path.join(directory, 'lock'), 'w') as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        archive = read(os.path.join(directory, ARCHIVE)) or {}
+        workers, finished = {}, []
+        for path in glob(os.path.join(directory, '*.json')):
+            name = os.path.basename(path)[:-len('.json')]
+            if not name.isdigit():
+                continue
+            data = read(path)
+            if data is None:
+                continue
+            if is_alive(int(name)):
+                workers[name] = data
+            else:
+                finished.append(path)
+                archive = {
+                    metric.name: metric.snapshot()
+                    for metric in combine([archive, data['metrics']])}
+        if finished:
+            write(os.path.join(directory, ARCHIVE), archive)
+            for path in finished:
+                os.remove(path)
+    return archive, workers
+
+
+def render_gauges(prefix, workers):
+    lines = []
+    names = dict.fromkeys(
+        name for stats in workers.values() for name in stats)
+    for name in names:
+        lines.append(f'# TYPE {prefix}_{name} gauge')
+        for worker, stats in workers.items():
+            if name in stats:
+                label = f'{{worker="{worker}"}}' if worker else ''
+                lines.append(f'{prefix}_{name}{label} {stats[name]}')
+    return lines
+
+
+def render():
+    """Возвращает метрики в текстовом формате Prometheus.
+
+    Если задан METRICS_DIR, счетчики и гистограммы суммируются по всем
+    воркерам, а показатели кешей и запуска выводятся с меткой worker.
+    Иначе выводятся метрики только этого процесса.
+    """
+    if settings.METRICS_DIR:
+        with _flush_lock:
+            flush()
+        archive, workers = collect()
+        combined = combine(
+            [archive] + [data['metrics'] for data in workers.values()])
+        gauges = {worker: data['gauges']
+                  for worker, data in sorted(workers.items())}
+    else:
+        data = snapshot()
+        combined = combine([data['metrics']])
+        gauges = {'': data['gauges']}
+    lines = []
+    for metric in combined:
+        lines += metric.render()
+    prefixes = dict.fromkeys(
+        prefix for stats in gauges.values() for prefix in stats)
+    for prefix in prefixes:
+        lines += render_gauges(prefix, {
+            worker: stats.get(prefix, {})
+            for worker, stats in gauges.items()})
+    return '\n'.join(lines) + '\n'
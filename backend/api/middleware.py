@@ -0,0 +1,132 @@
+import asyncio
+import logging
+import sys
+import time
+from collections import Counter
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils.deprecation import MiddlewareMixin
+from rest_framework.serializers import Field
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+current_recorder = ContextVar('current_recorder', default=None)
+
+
+def get_serializer_field():
+    """Ищет в стеке вызовов поле сериализатора, выполняющее запрос."""
+    frame = sys._getframe(3)
+    while frame is not None:
+        field = frame.f_locals.get('self')
+        if isinstance(field, Field) and field.field_name:
+            return f'{type(field.parent).__name__}.{field.field_name}'
+        frame = frame.f_back
+    return None
+
+
+def record_query(execute, sql, params, many, context):
+    """Обертка выполнения SQL, передающая запрос в QueryRecorder текущего
+    запроса.
+
+    Устанавливается на каждое соединение с базой данных, поэтому
+    запросы учитываются в любом потоке, куда передан контекст запроса.
+    """
+    recorder = current_recorder.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+class QueryRecorder:
+    """Обертка выполнения SQL, считающая запросы и их шаблоны.
+
+    Шаблоном считается текст запроса без параметров. Если включен
+    QUERY_REPEAT_WARNINGS, для каждого шаблона запоминается поле
+    сериализатора, из которого он был выполнен.
+    """
+
+    def __init__(self, find_fields):
+        self.find_fields = find_fields
+        self.count = 0
+        self.duration = 0
+        self.templates = Counter()
+        self.fields = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - started
+            self.count += 1
+            self.templates[sql] += 1
+            if self.find_fields and sql not in self.fields:
+                self.fields[sql] = get_serializer_field()
+
+
+class QueryMetricsMiddleware(MiddlewareMixin):
+    """Собирает время ответа и запросы к базе данных по endpoint.
+
+    Endpoint определяется по классу представления и действию вьюсета,
+    например RecipeViewSet.list. Метрики доступны по /api/_metrics.
+    Работает как в WSGI, так и в ASGI режиме.
+    """
+
+    def __call__(self, request):
+        if asyncio.iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder(settings.QUERY_REPEAT_WARNINGS)
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.observe(request, recorder, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder(settings.QUERY_REPEAT_WARNINGS)
+        token = current_recorder.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            current_recorder.reset(token)
+        self.observe(request, recorder, time.perf_counter() - started)
+        return response
+
+    def get_endpoint(self, request):
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return None
+        view = getattr(match.func, 'cls', None)
+        if view is None:
+            return f'{match.func.__module__}.{match.func.__name__}'
+        actions = getattr(match.func, 'actions', None) or {}
+        method = request.method.lower()
+        return f'{view.__name__}.{actions.get(method, method)}'
+
+    def observe(self, request, recorder, duration):
+        endpoint = self.get_endpoint(request)
+        if endpoint is None:
+            return
+        max_repeats = max(recorder.templates.values(), default=0)
+        metrics.observe(endpoint, duration, recorder.duration,
+                        recorder.count, max_repeats,
+                        settings.QUERY_REPEAT_THRESHOLD)
+        if (settings.QUERY_REPEAT_WARNINGS
+                and max_repeats > settings.QUERY_REPEAT_THRESHOLD):
+            self.warn(endpoint, recorder)
+
+    def warn(self, endpoint, recorder):
+        for sql, count in recorder.templates.most_common():
+            if count <= settings.QUERY_REPEAT_THRESHOLD:
+                break
+            logger.warning(
+                'Возможный N+1 в %s: запрос повторен %d раз из поля %s: %s',
+                endpoint, count, recorder.fields.get(sql) or 'неизвестно',
+                sql[:200])
@@ -1,4 +1,13 @@
+import hashlib
+
+from django.conf import settings
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
 from rest_framework import mixins, viewsets
+from rest_framework.response import Response
+
+from recipes import versions
+from . import cache
 
 
 class CreateListDestroyViewSet(
@@ -10,3 +19,156 @@ class CreateListDestroyViewSet(
     """Миксин для вьюсета подписок."""
 
     pass
+
+
+class ConditionalGetMixin:
+    """Миксин условных GET запросов для list и retrieve.
+
+    ETag и Last-Modified вычисляются по версиям данных из version_keys
+    до выполнения запросов вьюсета. Если ответ зависит от пользователя
+    (personalized), в ETag входит версия его избранного, списка покупок
+    и подписок.
+    """
+
+    version_keys = ()
+    personalized = False
+    content_versions = {}
+
+    def get_version_keys(self):
+        keys = list(self.version_keys)
+        if self.personalized and self.request.user.is_authenticated:
+            keys.append(versions.user_key(self.request.user.id))
+        return keys
+
+    def get_object_version(self):
+        """Возвращает дату изменения объекта для retrieve или None."""
+        return None
+
+    def get_validators(self):
+        keys = self.get_version_keys()
+        dates = []
+        if self.action == 'retrieve':
+            object_version = self.get_object_version()
+            if object_version is not None:
+                dates.append(object_version)
+        current = self.content_versions = versions.get_versions(keys)
+        dates += [updated_at for _, updated_at in current.values()
+                  if updated_at is not None]
+        # Ответ зависит от строки запроса (страница, фильтры, курсор) и
+        # от выбранного рендерера.
+        tag = '|'.join(
+            [self.request.get_full_path(),
+             getattr(self.request, 'accepted_media_type', '')]
+            + [f'{key}={version}' for key, (version, _) in current.items()]
+            + [str(date.timestamp()) for date in dates[:1]])
+        etag = quote_etag(hashlib.sha1(tag.encode()).hexdigest())
+        return etag, max(dates).timestamp() if dates else None
+
+    def conditional_response(self, method, request, *args, **kwargs):
+        etag, last_modified = self.get_validators()
+        response = get_conditional_response(
+            request, etag=etag, last_modified=last_modified)
+        if response is None:
+            response = method(request, *args, **kwargs)
+        if response.status_code in (200, 304) and etag:
+            response['ETag'] = etag
+            if last_modified:
+                response['Last-Modified'] = http_date(last_modified)
+        patch_vary_headers(response, ('Accept',))
+        if self.personalized:
+            patch_vary_headers(response, ('Authorization',))
+        return response
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(
+            super().retrieve, request, *args, **kwargs)
+
+
+class AnonymousListCacheMixin:
+    """Миксин кеширования страниц списка для анонимных пользователей.
+
+    Ключ кеша включает версии данных из version_keys, поэтому сигналы,
+    увеличивающие версии, делают устаревшие страницы недоступными.
+    """
+
+    list_cache_timeout = settings.RECIPE_LIST_CACHE_TIMEOUT
+
+    def get_list_cache_timeout(self):
+        return self.list_cache_timeout
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        key = cache.get_cache_key(
+            request, self.basename,
+            self.content_versions
+            or versions.get_versions(self.version_keys))
+        data = cache.get(key)
+        if data is not None:
+            response = Response(data)
+            response['X-Cache'] = 'HIT'
+            return response
+        response = super().list(request, *args, **kwargs)
+        if response.status_code == 200:
+            cache.set(key, response.data, self.get_list_cache_timeout())
+        response['X-Cache'] = 'MISS'
+        return response
+
+
+class FragmentCacheMixin:
+    """Миксин списка с кешем сериализованных фрагментов объектов.
+
+    Часть представления, одинаковая для всех пользователей, хранится в
+    кеше по id объекта, дате изменения и версиям fragment_version_keys.
+    Фрагменты страницы читаются одним get_many, сериализатор выполняется
+    только для промахов, а поля пользователя накладываются в
+    personalize_fragment.
+    """
+
+    fragment_version_keys = ()
+    fragment_changed_field = 'updated_at'
+    fragment_timeout = settings.FRAGMENT_CACHE_TIMEOUT
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(queryset)
+        if page is None:
+            return Response(self.get_fragments(list(queryset)))
+        return self.get_paginated_response(self.get_fragments(page))
+
+    def serialize_fragments(self, pks):
+        """Возвращает представления объектов для промахов кеша по id."""
+        serializer = self.get_serializer(
+            self.get_queryset().filter(pk__in=pks), many=True)
+        return {item['id']: item for item in serializer.data}
+
+    def personalize_fragment(self, obj, data):
+        """Добавляет во фрагмент поля текущего пользователя."""
+        return data
+
+    def get_fragments(self, objects):
+        current = {
+            key: self.content_versions[key]
+            for key in self.fragment_version_keys
+            if key in self.content_versions}
+        if len(current) < len(self.fragment_version_keys):
+            current = versions.get_versions(self.fragment_version_keys)
+        keys = {
+            obj.pk: cache.get_fragment_key(
+                self.request, self.basename, obj.pk,
+                getattr(obj, self.fragment_changed_field), current)
+            for obj in objects}
+        fragments = cache.get_many(list(keys.values()))
+        missing = [pk for pk, key in keys.items() if key not in fragments]
+        if missing:
+            created = {
+                keys[pk]: data
+                for pk, data in self.serialize_fragments(missing).items()}
+            cache.set_many(created, self.fragment_timeout)
+            fragments.update(created)
+        return [self.personalize_fragment(obj, fragments[keys[obj.pk]])
+                for obj in objects]
@@ -1,6 +1,148 @@
-from rest_framework.pagination import PageNumberPagination
+import json
+from functools import reduce
+from operator import or_
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import (CursorPagination, PageNumberPagination,
+                                       _reverse_ordering)
+
+from foodgram_backend.constants import MAX_PAGE_SIZE, PAGE_SIZE
 
 
 class PageNumberLimitPagination(PageNumberPagination):
-    page_size = 6
+    page_size = PAGE_SIZE
     page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+
+
+class CursorLimitPagination(CursorPagination):
+    """Курсорная пагинация с поиском по составному ключу сортировки.
+
+    CursorPagination из DRF фильтрует только по первому полю сортировки, а
+    записи с равным значением пропускает через OFFSET. Здесь позиция
+    курсора хранит значения всех полей сортировки, последним из которых
+    всегда идет id, и следующая страница выбирается условием
+    (pub_date, id) < (x, y) без OFFSET. Поля сортировки не могут быть NULL.
+    """
+
+    page_size = PAGE_SIZE
+    page_size_query_param = 'limit'
+    max_page_size = MAX_PAGE_SIZE
+    ordering = ('-pub_date', '-id')
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not any(field.lstrip('-') in ('id', 'pk') for field in ordering):
+            ordering += ('-id' if ordering[-1].startswith('-') else 'id',)
+        return ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+        self.cursor = self.decode_cursor(request)
+        reverse = self.cursor is not None and self.cursor.reverse
+        current_position = self.cursor and self.cursor.position
+        ordering = (_reverse_ordering(self.ordering) if reverse
+                    else self.ordering)
+        queryset = queryset.order_by(*ordering)
+        if current_position is not None:
+            queryset = queryset.filter(self.get_seek_filter(
+                queryset.model, ordering, current_position))
+        results = list(queryset[:self.page_size + 1])
+        self.page = results[:self.page_size]
+        following_position = None
+        if len(results) > len(self.page):
+            following_position = self._get_position_from_instance(
+                results[-1], self.ordering)
+        if reverse:
+            self.page.reverse()
+            self.has_next = current_position is not None
+            self.has_previous = following_position is not None
+            self.next_position = current_position
+            self.previous_position = following_position
+        else:
+            self.has_next = following_position is not None
+            self.has_previous = current_position is not None
+            self.next_position = following_position
+            self.previous_position = current_position
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+        return self.page
+
+    def get_seek_filter(self, model, ordering, position):
+        """Условие для записей после позиции в порядке ordering.
+
+        Для полей (a, b) по убыванию это a < x OR (a = x AND b < y), а
+        дополнительное a <= x позволяет базе искать по индексу.
+        """
+        fields = []
+        for order in ordering:
+            name = order.lstrip('-')
+            field = model._meta.pk if name == 'pk' else model._meta.get_field(
+                name)
+            fields.append((field.name, order.startswith('-'), field))
+        try:
+            values = json.loads(position)
+            if not isinstance(values, list) or len(values) != len(fields):
+                raise ValueError
+            values = [field.to_python(value)
+                      for (_, _, field), value in zip(fields, values)]
+        except (ValueError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        conditions = []
+        for number, (name, descending, _) in enumerate(fields):
+            equal = {
+                previous: value for (previous, _, _), value in zip(
+                    fields[:number], values)}
+            lookup = f'{name}__lt' if descending else f'{name}__gt'
+            conditions.append(Q(**equal, **{lookup: values[number]}))
+        name, descending, _ = fields[0]
+        bound = Q(**{f'{name}__lte' if descending else f'{name}__gte':
+                     values[0]})
+        return bound & reduce(or_, conditions)
+
+    def _get_position_from_instance(self, instance, ordering):
+        values = []
+        for field in ordering:
+            name = field.lstrip('-')
+            value = (instance[name] if isinstance(instance, dict)
+                     else getattr(instance, name))
+            values.append(str(value))
+        return json.dumps(values)
+
+
+class SwitchablePagination(PageNumberLimitPagination):
+    """Постраничная пагинация с переходом на курсорную.
+
+    Курсорная пагинация включается параметром pagination=cursor или
+    наличием параметра cursor и не выполняет COUNT и OFFSET запросов.
+    """
+
+    cursor_ordering = CursorLimitPagination.ordering
+    cursor_paginator = None
+
+    def use_cursor(self, request):
+        return (request.query_params.get('pagination') == 'cursor'
+                or 'cursor' in request.query_params)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if not self.use_cursor(request):
+            return super().paginate_queryset(queryset, request, view)
+        self.cursor_paginator = CursorLimitPagination()
+        self.cursor_paginator.ordering = self.cursor_ordering
+        return self.cursor_paginator.paginate_queryset(
+            queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class SubscriptionPagination(SwitchablePagination):
+    cursor_ordering = ('username',)
@@ -0,0 +1,95 @@
+from collections import defaultdict
+
+from django.core.files.storage import default_storage
+from django.db.models import F
+
+from recipes.images import IMAGE_VARIANTS
+from recipes.models import Recipe, RecipeIngredient, Tag
+from .serializers import get_subscribed_ids
+
+USER_FIELDS = ('email', 'id', 'username', 'first_name', 'last_name')
+
+
+def get_image_url(request, name, image_variants, variant=None):
+    """Повторяет RecipeImageMixin.get_image_url для строки values()."""
+    if not name:
+        return None
+    url = default_storage.url(image_variants.get(variant) or name)
+    return request.build_absolute_uri(url) if request else url
+
+
+def get_recipes(pks, request):
+    """Возвращает представления рецептов по id в виде словаря.
+
+    Результат совпадает с RecipeSerializer, но строится из строк
+    values() без полей DRF: теги и ингредиенты группируются по рецептам
+    в обычных словарях. Флаги избранного и списка покупок равны False,
+    их накладывает вьюсет по аннотациям страницы.
+    """
+    tags = defaultdict(list)
+    for row in Tag.objects.filter(recipes__in=pks).values(
+            'id', 'name', 'color', 'slug', recipe_id=F('recipes')):
+        recipe_id = row.pop('recipe_id')
+        tags[recipe_id].append(row)
+    ingredients = defaultdict(list)
+    for row in RecipeIngredient.objects.filter(recipe__in=pks).values(
+            'recipe_id', 'ingredient_id', 'ingredient__name',
+            'ingredient__measurement_unit', 'amount'):
+        ingredients[row['recipe_id']].append({
+            'id': row['ingredient_id'],
+            'name': row['ingredient__name'],
+            'measurement_unit': row['ingredient__measurement_unit'],
+            'amount': row['amount'],
+        })
+    subscribed_ids = get_subscribed_ids(request)
+    recipes = {}
+    for row in Recipe.objects.filter(pk__in=pks).values(
+            'id', 'name', 'image', 'image_variants', 'text',
+            'cooking_time', *(f'author__{field}' for field in USER_FIELDS)):
+        author = {field: row[f'author__{field}'] for field in USER_FIELDS}
+        author['is_subscribed'] = author['id'] in subscribed_ids
+        recipes[row['id']] = {
+            'id': row['id'],
+            'tags': tags[row['id']],
+            'author': author,
+            'ingredients': ingredients[row['id']],
+            'is_favorited': False,
+            'is_in_shopping_cart': False,
+            'name': row['name'],
+            'image': get_image_url(
+                request, row['image'], row['image_variants']),
+            'image_variants': {
+                variant: get_image_url(
+                    request, row['image'], row['image_variants'], variant)
+                for variant in IMAGE_VARIANTS},
+            'text': row['text'],
+            'cooking_time': row['cooking_time'],
+        }
+    return recipes
+
+
+def get_subscriptions(authors, recipes):
+    """Возвращает представления авторов страницы подписок.
+
+    authors - строки values() с полями USER_FIELDS и recipes_count,
+    recipes - queryset рецептов авторов. Как и в ShortRecipeSerializer
+    без контекста, ссылки на изображения относительные.
+    """
+    short_recipes = defaultdict(list)
+    for row in recipes.filter(
+            author__in=[author['id'] for author in authors]).values(
+                'author_id', 'id', 'name', 'image', 'image_variants',
+                'cooking_time'):
+        short_recipes[row['author_id']].append({
+            'id': row['id'],
+            'name': row['name'],
+            'image': get_image_url(
+                None, row['image'], row['image_variants'], 'thumbnail'),
+            'cooking_time': row['cooking_time'],
+        })
+    return [
+        {**{field: author[field] for field in USER_FIELDS},
+         'is_subscribed': True,
+         'recipes': short_recipes[author['id']],
+         'recipes_count': author['recipes_count']}
+        for author in authors]
@@ -1,10 +1,15 @@
 
 from django.contrib.auth import get_user_model
+from django.core.files.storage import default_storage
 from django.core.validators import MinValueValidator
+from django.db import transaction
 from djoser.serializers import UserSerializer
 from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 
+from foodgram_backend.constants import MAX_BATCH_SIZE
+from recipes import shopping_list
+from recipes.images import IMAGE_VARIANTS, schedule_variants
 from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                             ShoppingCart, Tag)
 from users.models import Subscription
@@ -12,13 +17,70 @@ from users.models import Subscription
 User = get_user_model()
 
 
-class ShortRecipeSerializer(serializers.ModelSerializer):
+def get_subscribed_ids(request):
+    """Возвращает id авторов, на которых подписан пользователь запроса.
+
+    Множество загружается одним запросом и хранится в объекте запроса,
+    поэтому все сериализаторы в рамках запроса используют его повторно.
+    """
+    if not request.user.is_authenticated:
+        return set()
+    if not hasattr(request, 'subscribed_ids'):
+        request.subscribed_ids = set(Subscription.objects.filter(
+            user=request.user).values_list('subscribe_id', flat=True))
+    return request.subscribed_ids
+
+
+def update_subscribed_ids(request, author_id, subscribed):
+    """Обновляет загруженное множество подписок после их изменения."""
+    if not hasattr(request, 'subscribed_ids'):
+        return
+    if subscribed:
+        request.subscribed_ids.add(author_id)
+    else:
+        request.subscribed_ids.discard(author_id)
+
+
+def get_recipes_limit(request):
+    """Возвращает значение recipes_limit из запроса или None."""
+    try:
+        recipes_limit = int(request.GET['recipes_limit'])
+    except (KeyError, ValueError):
+        return None
+    return recipes_limit if recipes_limit >= 0 else None
+
+
+class RecipeImageMixin:
+    """Миксин для вывода адресов уменьшенных изображений рецепта."""
+
+    def get_image_url(self, recipe, variant=None):
+        """Возвращает адрес варианта изображения или оригинала, пока
+        вариант еще не построен."""
+        if not recipe.image:
+            return None
+        name = recipe.image_variants.get(variant)
+        url = default_storage.url(name) if name else recipe.image.url
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+    def get_image_variants(self, recipe):
+        return {
+            variant: self.get_image_url(recipe, variant)
+            for variant in IMAGE_VARIANTS}
+
+
+class ShortRecipeSerializer(RecipeImageMixin, serializers.ModelSerializer):
     """Сериализатор для вывода коротких данных о рецепте."""
 
+    image = serializers.SerializerMethodField()
+
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
 
+    def get_image(self, recipe):
+        return self.get_image_url(recipe, 'thumbnail')
+
 
 class CustomUserShortSerializer(UserSerializer):
     """Сериализатор для работы с профилями пользователя."""
@@ -32,10 +94,9 @@ class CustomUserShortSerializer(UserSerializer):
 
     def get_is_subscribed(self, object):
         """Метод для вывода подписки на пользователя."""
-        return bool(self.context['request'].user.is_authenticated
-                    and Subscription.objects.filter(
-                        user=self.context['request'].user,
-                        subscribe=object).exists())
+        if hasattr(object, 'is_subscribed'):
+            return object.is_subscribed
+        return object.id in get_subscribed_ids(self.context['request'])
 
 
 class CustomUserFullSerializer(CustomUserShortSerializer):
@@ -49,18 +110,20 @@ class CustomUserFullSerializer(CustomUserShortSerializer):
             'recipes', 'recipes_count']
 
     def get_recipes(self, object):
-        recipes = Recipe.objects.filter(author=object)
-        recipes_limit = self.context['request'].GET.get('recipes_limit')
-        if recipes_limit:
-            try:
-                recipes = recipes[:int(recipes_limit)]
-            except ValueError:
-                pass
+        if hasattr(object, 'limited_recipes'):
+            recipes = object.limited_recipes
+        else:
+            recipes = Recipe.objects.filter(author=object)
+            recipes_limit = get_recipes_limit(self.context['request'])
+            if recipes_limit is not None:
+                recipes = recipes[:recipes_limit]
         serializers = ShortRecipeSerializer(recipes, many=True)
         return serializers.data
 
     def get_recipes_count(self, object):
         """Метод выводящий количество рецептов у пользователя."""
+        if hasattr(object, 'recipes_count'):
+            return object.recipes_count
         return Recipe.objects.filter(author=object).count()
 
 
@@ -132,7 +195,7 @@ class IngredientsAmountSerializer(serializers.ModelSerializer):
         fields = ('id', 'amount')
 
 
-class RecipeSerializer(serializers.ModelSerializer):
+class RecipeSerializer(RecipeImageMixin, serializers.ModelSerializer):
     """Сериализатор для модели рецепта."""
 
     author = CustomUserShortSerializer(read_only=True)
@@ -142,6 +205,7 @@ class RecipeSerializer(serializers.ModelSerializer):
         source='recipe_ingredients')
     tags = TagSerializer(many=True, read_only=True)
     image = Base64ImageField(required=True)
+    image_variants = serializers.SerializerMethodField()
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
 
@@ -150,11 +214,13 @@ class RecipeSerializer(serializers.ModelSerializer):
         fields = (
             'id', 'tags', 'author', 'ingredients',
             'is_favorited', 'is_in_shopping_cart',
-            'name', 'image', 'text', 'cooking_time'
+            'name', 'image', 'image_variants', 'text', 'cooking_time'
         )
 
     def get_is_favorited(self, obj):
         """Метод для отображения нахождения рецепта в избранном."""
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         return bool(self.context['request'].user.is_authenticated
                     and Favorite.objects.filter(
                         user=self.context['request'].user,
@@ -162,6 +228,8 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         """Метод для отображения нахождения рецепта в списке покупок."""
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         return bool(self.context['request'].user.is_authenticated
                     and ShoppingCart.objects.filter(
                         user=self.context['request'].user,
@@ -211,10 +279,14 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
         return value
 
     def to_representation(self, instance):
+        request = self.context.get('request')
+        instance = Recipe.objects.with_user_flags(
+            request.user).with_related().get(pk=instance.pk)
         return RecipeSerializer(instance, context={
-            'request': self.context.get('request')
+            'request': request
         }).data
 
+    @transaction.atomic
     def create(self, validated_data):
         ingredients = validated_data.pop('ingredients')
         tags = validated_data.pop('tags')
@@ -223,25 +295,76 @@ class RecipeCreateUpdateSerializer(serializers.ModelSerializer):
             **validated_data)
         recipe.tags.set(tags)
         self.recipe_ingredient_create(ingredients, recipe)
+        schedule_variants(recipe)
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         ingredients = validated_data.pop('ingredients')
-        instance.ingredients.clear()
         tags = validated_data.pop('tags')
         instance.tags.set(tags)
-        self.recipe_ingredient_create(ingredients, recipe=instance)
-        return instance
+        old_amounts = self.recipe_ingredient_update(ingredients, instance)
+        shopping_list.update_recipe(instance, old_amounts, {
+            ingredient['id'].id: ingredient['amount']
+            for ingredient in ingredients})
+        if 'image' in validated_data:
+            stale = instance.image_variants.values()
+            validated_data['image_variants'] = {}
+            schedule_variants(instance, stale)
+        return super().update(instance, validated_data)
 
     @staticmethod
     def recipe_ingredient_create(ingredients, recipe):
         """Метод который создает связь ингредиентов с рецептом."""
-        for ingredient in ingredients:
-            RecipeIngredient.objects.create(
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
                 ingredient=ingredient['id'],
                 recipe=recipe,
-                amount=ingredient['amount']
-            )
+                amount=ingredient['amount'])
+            for ingredient in ingredients
+        )
+
+    @staticmethod
+    def recipe_ingredient_update(ingredients, recipe):
+        """Метод который приводит связи ингредиентов рецепта к новому
+        списку, изменяя только отличающиеся строки.
+
+        Возвращает прежнее количество каждого ингредиента рецепта.
+        """
+        existing = {
+            recipe_ingredient.ingredient_id: recipe_ingredient
+            for recipe_ingredient in recipe.recipe_ingredients.all()}
+        old_amounts = {
+            ingredient_id: recipe_ingredient.amount
+            for ingredient_id, recipe_ingredient in existing.items()}
+        to_create, to_update = [], []
+        for ingredient in ingredients:
+            recipe_ingredient = existing.pop(ingredient['id'].id, None)
+            if recipe_ingredient is None:
+                to_create.append(RecipeIngredient(
+                    ingredient=ingredient['id'],
+                    recipe=recipe,
+                    amount=ingredient['amount']))
+            elif recipe_ingredient.amount != ingredient['amount']:
+                recipe_ingredient.amount = ingredient['amount']
+                to_update.append(recipe_ingredient)
+        if to_create:
+            RecipeIngredient.objects.bulk_create(to_create)
+        if to_update:
+            RecipeIngredient.objects.bulk_update(to_update, ('amount',))
+        if existing:
+            RecipeIngredient.objects.filter(
+                pk__in=[item.pk for item in existing.values()]).delete()
+        return old_amounts
+
+
+class RecipeIdsSerializer(serializers.Serializer):
+    """Сериализатор списка id рецептов для пакетных операций."""
+
+    recipes = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE)
 
 
 class FavoriteSerializer(serializers.ModelSerializer):
@@ -277,6 +400,12 @@ class ShoppingCartSerializer(serializers.ModelSerializer):
                 'Рецепт уже есть в списке покупок.')
         return data
 
+    @transaction.atomic
+    def create(self, validated_data):
+        shopping_cart = super().create(validated_data)
+        shopping_list.add_recipe(shopping_cart.user, shopping_cart.recipe)
+        return shopping_cart
+
     def to_representation(self, instance):
         return ShortRecipeSerializer(instance.recipe, context={
             'request': self.context.get('request')
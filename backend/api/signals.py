@@ -0,0 +1,40 @@
+from django.contrib.auth import get_user_model
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+
+from . import authentication
+from .db_routing import check_connections
+from .middleware import record_query
+
+User = get_user_model()
+
+
+@receiver(post_delete, sender=Token)
+def invalidate_deleted_token(instance, **kwargs):
+    """Убирает из кеша токен, удаленный при выходе из системы."""
+    authentication.invalidate((instance.key,))
+
+
+@receiver(post_save, sender=User)
+def invalidate_user_tokens(instance, update_fields=None, **kwargs):
+    """Убирает из кеша токены пользователя при смене пароля,
+    деактивации и других изменениях учетной записи."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    authentication.invalidate(user_id=instance.pk)
+
+
+@receiver(connection_created)
+def install_query_recorder(connection, **kwargs):
+    """Подключает учет запросов для метрик к новому соединению."""
+    if record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(record_query)
+
+
+@receiver(request_started)
+def check_persistent_connections(**kwargs):
+    """Проверяет постоянные соединения перед обработкой запроса."""
+    check_connections()
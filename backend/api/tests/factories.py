@@ -0,0 +1,66 @@
+import base64
+import shutil
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+User = get_user_model()
+
+PNG = base64.b64decode(
+    'iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAAADUlEQVR4nGP4z8Dw'
+    'HwAFAAH/iZk9HQAAAABJRU5ErkJggg==')
+
+
+def create_user(number, **fields):
+    return User.objects.create_user(
+        email=f'user{number}@example.com', username=f'user{number}',
+        first_name=f'Имя{number}', last_name=f'Фамилия{number}',
+        password='Pass12345!x', **fields)
+
+
+def create_catalog(tags=3, ingredients=10):
+    return (
+        [Tag.objects.create(name=f'Тег {number}', color=f'#00000{number}',
+                            slug=f'tag{number}')
+         for number in range(tags)],
+        [Ingredient.objects.create(name=f'Ингредиент {number}',
+                                   measurement_unit='г')
+         for number in range(ingredients)])
+
+
+def create_recipe(author, tags, ingredients, number=0, image=True):
+    recipe = Recipe.objects.create(
+        author=author, name=f'Рецепт {number}', text=f'Описание {number}',
+        cooking_time=number + 1,
+        image=ContentFile(PNG, 'recipe.png') if image else '')
+    recipe.tags.set(tags)
+    RecipeIngredient.objects.bulk_create(
+        RecipeIngredient(recipe=recipe, ingredient=ingredient,
+                         amount=index + 1)
+        for index, ingredient in enumerate(ingredients))
+    return recipe
+
+
+class MediaTestCase(TestCase):
+    """Тесты с изображениями во временном MEDIA_ROOT и пустым кешем."""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.media_root = tempfile.mkdtemp()
+        cls.media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        cls.media_override.enable()
+        super().setUpClass()
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        cls.media_override.disable()
+        shutil.rmtree(cls.media_root, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
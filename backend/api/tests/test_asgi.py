@@ -0,0 +1,91 @@
+import threading
+
+from asgiref.sync import sync_to_async
+from django.test import SimpleTestCase, TransactionTestCase
+from rest_framework.authtoken.models import Token
+
+from api.async_views import StreamingASGIHandler, iterate_in_pool
+from recipes import shopping_list
+from .factories import create_catalog, create_recipe, create_user
+
+
+class IterateInPoolTest(SimpleTestCase):
+    """Части итератора отправляются до конца перебора."""
+
+    async def test_first_part_before_end(self):
+        received = threading.Event()
+
+        def parts():
+            yield b'first'
+            # Итератор продолжится, только когда первая часть получена.
+            if not received.wait(5):
+                raise AssertionError('Ответ собирается целиком')
+            yield b'second'
+
+        result = []
+        async for part in iterate_in_pool(parts()):
+            result.append(part)
+            received.set()
+        self.assertEqual(result, [b'first', b'second'])
+
+    async def test_stream_pool(self):
+        def parts():
+            yield threading.current_thread().name.encode()
+
+        names = [part async for part in iterate_in_pool(parts())]
+        # Медленный клиент держит поток выгрузок, а не пула запросов.
+        self.assertTrue(names[0].startswith(b'async-stream'), names)
+
+    async def test_error(self):
+        def parts():
+            yield b'first'
+            raise ValueError
+
+        with self.assertRaises(ValueError):
+            async for _ in iterate_in_pool(parts()):
+                pass
+
+
+class StreamingASGIHandlerTest(TransactionTestCase):
+    """Список покупок отправляется по частям обработчиком ASGI."""
+
+    def setUp(self):
+        tags, ingredients = create_catalog()
+        self.user = create_user(0)
+        self.token = Token.objects.create(user=self.user)
+        recipe = create_recipe(
+            self.user, tags[:1], ingredients[:3], image=False)
+        shopping_list.add_recipe(self.user, recipe)
+
+    async def test_download_shopping_cart(self):
+        messages = []
+
+        async def receive():
+            return {'type': 'http.request'}
+
+        async def send(message):
+            messages.append(message)
+
+        await StreamingASGIHandler()({
+            'type': 'http',
+            'method': 'GET',
+            'path': '/api/recipes/download_shopping_cart/',
+            'query_string': b'',
+            'headers': [
+                (b'host', b'testserver'),
+                (b'authorization', f'Token {self.token}'.encode()),
+            ],
+        }, receive, send)
+
+        self.assertEqual(messages[0]['status'], 200)
+        body = [message for message in messages[1:]
+                if message.get('body')]
+        self.assertGreater(len(body), 1)
+        self.assertTrue(all(message['more_body'] for message in body))
+        self.assertFalse(messages[-1].get('more_body', False))
+        content = b''.join(message['body'] for message in body).decode()
+        expected = await sync_to_async(list)(
+            self.user.shopping_list_items.values_list(
+                'ingredient__name', flat=True))
+        for name in expected:
+            self.assertIn(name, content)
@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.test import TestCase
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api import authentication
+from .factories import create_user
+
+
+class CachedTokenAuthenticationTest(TestCase):
+    """Кешированный токен перестает работать сразу после отзыва в этом
+    воркере и через AUTH_TOKEN_CACHE_TTL в остальных."""
+
+    def setUp(self):
+        authentication.token_cache.clear()
+        self.user = create_user(0)
+        self.token = Token.objects.create(user=self.user)
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Token {self.token}')
+        # Первый запрос кладет токен в кеш, второй читает из кеша.
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        hits = authentication.get_stats()['hits']
+        with self.assertNumQueries(0):
+            authentication.CachedTokenAuthentication(
+            ).authenticate_credentials(self.token.key)
+        self.assertEqual(authentication.get_stats()['hits'], hits + 1)
+
+    def test_logout(self):
+        response = self.client.post('/api/auth/token/logout/')
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_request_started_before_logout(self):
+        generation = authentication.token_cache.generation
+        token = Token.objects.select_related('user').get(pk=self.token.pk)
+        self.client.post('/api/auth/token/logout/')
+        # Запрос, прочитавший токен до выхода, пытается вернуть его в кеш.
+        authentication.token_cache.set(token.key, token, generation)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_other_worker_expires_by_ttl(self):
+        # Токен удален в другом воркере: сигнал сюда не доходит.
+        Token.objects.filter(pk=self.token.pk)._raw_delete('default')
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
+        expired = (authentication.time.monotonic()
+                   + authentication.token_cache.ttl + 1)
+        with mock.patch.object(
+                authentication.time, 'monotonic', return_value=expired):
+            self.assertEqual(
+                self.client.get('/api/users/me/').status_code, 401)
+
+    def test_deactivation(self):
+        self.user.is_active = False
+        self.user.save()
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 401)
+
+    def test_password_change(self):
+        response = self.client.post('/api/users/set_password/', {
+            'current_password': 'Pass12345!x',
+            'new_password': 'NewPass12345!x'})
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.client.get('/api/users/me/').status_code, 200)
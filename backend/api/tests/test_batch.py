@@ -0,0 +1,78 @@
+from rest_framework.test import APIClient
+
+from recipes import shopping_list
+from recipes.models import Recipe, ShoppingCart
+from .factories import (MediaTestCase, create_catalog, create_recipe,
+                        create_user)
+
+BATCH = '/api/recipes/shopping_cart/'
+
+
+class ShoppingCartBatchTest(MediaTestCase):
+    """Пакетное добавление и удаление учитывает каждый рецепт один раз."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog()
+        author = create_user(0)
+        cls.recipes = [
+            create_recipe(author, tags[:1], ingredients[:3], number)
+            for number in range(3)]
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user(1)
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def get_statuses(self, response):
+        self.assertEqual(response.status_code, 200)
+        return {row['id']: row['status']
+                for row in response.json()['results']}
+
+    def assert_counters(self, *expected):
+        self.assertEqual(
+            list(Recipe.objects.filter(
+                pk__in=[recipe.pk for recipe in self.recipes]
+            ).order_by('pk').values_list('in_carts_count', flat=True)),
+            list(expected))
+
+    def test_add(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        self.client.post(f'/api/recipes/{first}/shopping_cart/')
+
+        with self.assertNumQueries(12):
+            response = self.client.post(
+                BATCH, {'recipes': [first, second, 999, second, third]},
+                format='json')
+
+        self.assertEqual(self.get_statuses(response), {
+            first: 'exists', second: 'added', 999: 'not_found',
+            third: 'added'})
+        self.assertEqual(
+            response.json()['results'][1]['recipe']['id'], second)
+        self.assertEqual(
+            ShoppingCart.objects.filter(user=self.user).count(), 3)
+        self.assert_counters(1, 1, 1)
+        self.assertEqual(shopping_list.find_inconsistencies(), [])
+
+        response = self.client.post(
+            BATCH, {'recipes': [second]}, format='json')
+        self.assertEqual(self.get_statuses(response), {second: 'exists'})
+        self.assert_counters(1, 1, 1)
+
+    def test_remove(self):
+        first, second, third = (recipe.pk for recipe in self.recipes)
+        self.client.post(BATCH, {'recipes': [first, second]}, format='json')
+
+        # Один DELETE без сигналов для каждой записи.
+        with self.assertNumQueries(10):
+            response = self.client.delete(
+                BATCH, {'recipes': [second, third]}, format='json')
+
+        self.assertEqual(self.get_statuses(response), {
+            second: 'removed', third: 'missing'})
+        self.assertEqual(list(ShoppingCart.objects.filter(
+            user=self.user).values_list('recipe_id', flat=True)), [first])
+        self.assert_counters(1, 0, 0)
+        self.assertEqual(shopping_list.find_inconsistencies(), [])
@@ -0,0 +1,124 @@
+import io
+import json
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+from rest_framework.test import APIClient
+
+from api.management.commands import load_ingredients
+from recipes.models import Ingredient, Tag
+from recipes.search import ingredient_index
+
+
+class CatalogLoaderTest(TestCase):
+    """Загрузка справочников командами меняет ETag и ответы API даже в
+    процессах, которые не выполняли загрузку."""
+
+    def setUp(self):
+        ingredient_index.invalidate()
+        self.client = APIClient()
+
+    def test_load_ingredients(self):
+        first = self.client.get('/api/ingredients/?name=шафр')
+        self.assertEqual(first.json(), [])
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / 'ingredients.csv'
+            path.write_text('шафран,г\n', encoding='UTF-8')
+            # Сброс индекса в процессе команды не виден веб-процессам.
+            with mock.patch.object(ingredient_index, 'invalidate'):
+                call_command('load_ingredients', path, stdout=mock.Mock())
+
+        response = self.client.get(
+            '/api/ingredients/?name=шафр', HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [ingredient['name'] for ingredient in response.json()],
+            ['шафран'])
+
+    def test_load_tags(self):
+        first = self.client.get('/api/tags/')
+        self.assertEqual(first.json(), [])
+        call_command('load_tags', stdout=mock.Mock())
+
+        response = self.client.get(
+            '/api/tags/', HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 3)
+
+
+class IngredientLoaderTest(TestCase):
+    """Загрузка ингредиентов читает файл по частям и считает вставленные
+    строки."""
+
+    ROWS = [{'name': 'шафран', 'measurement_unit': 'г'},
+            {'name': 'имбирь', 'measurement_unit': 'шт. [корень]'}]
+
+    def load(self, name, content, existing=()):
+        stdout = io.StringIO()
+        with tempfile.TemporaryDirectory() as directory:
+            path = Path(directory) / name
+            path.write_text(content, encoding='UTF-8')
+            # Ингредиенты, добавленные после чтения существующих.
+            with mock.patch.object(
+                    Ingredient.objects, 'values_list', return_value=existing):
+                call_command('load_ingredients', path, stdout=stdout)
+        return stdout.getvalue()
+
+    def test_json_chunks(self):
+        with mock.patch.object(load_ingredients, 'CHUNK_SIZE', 7):
+            output = self.load('ingredients.json', json.dumps(
+                self.ROWS, ensure_ascii=False, indent=1))
+
+        self.assertIn('добавлено ингредиентов: 2 ', output)
+        self.assertEqual(
+            set(Ingredient.objects.values_list('name', 'measurement_unit')),
+            {(row['name'], row['measurement_unit']) for row in self.ROWS})
+
+    def test_json_errors(self):
+        for content in ('{}', '[{"name": "a", "measurement_unit": "г"},]',
+                        '[{"name": "a", "measurement_unit": "г"}'):
+            with self.subTest(content=content):
+                with self.assertRaisesMessage(
+                        CommandError, 'Не удалось прочитать'):
+                    self.load('ingredients.json', content)
+
+    def test_jsonl_created(self):
+        Ingredient.objects.create(name='шафран', measurement_unit='г')
+
+        output = self.load('ingredients.jsonl', ''.join(
+            json.dumps(row, ensure_ascii=False) + '\n' for row in self.ROWS))
+
+        # Уже существующий шафран не считается добавленным.
+        self.assertIn('Прочитано строк: 2, добавлено ингредиентов: 1 ',
+                      output)
+        self.assertEqual(Ingredient.objects.count(), 2)
+
+
+class TagLoaderTest(TestCase):
+    """Конфликтующие теги не выдаются за добавленные."""
+
+    def load(self):
+        stdout = io.StringIO()
+        call_command('load_tags', stdout=stdout)
+        return stdout.getvalue()
+
+    def test_conflict(self):
+        Tag.objects.create(name='Завтрак', color='#000000', slug='morning')
+
+        output = self.load()
+
+        self.assertIn('Тэг Завтрак не добавлен, конфликтует с Завтрак '
+                      '(morning, #000000)', output)
+        self.assertNotIn('Тэг Завтрак успешно добавлен', output)
+        self.assertIn('Тэг Обед успешно добавлен', output)
+        self.assertEqual(Tag.objects.count(), 3)
+
+    def test_repeat(self):
+        self.load()
+
+        self.assertEqual(self.load(), 'Все тэги уже загружены\n')
@@ -0,0 +1,47 @@
+from rest_framework.test import APIClient
+
+from .factories import (MediaTestCase, create_catalog, create_recipe,
+                        create_user)
+
+
+class ConditionalGetTest(MediaTestCase):
+    """ETag различается для разных строк запроса и рендереров."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog()
+        author = create_user(0)
+        for number in range(2):
+            create_recipe(author, tags[:1], ingredients[:2], number)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def get(self, url, etag=None, **headers):
+        if etag is not None:
+            headers['HTTP_IF_NONE_MATCH'] = etag
+        return self.client.get(url, **headers)
+
+    def test_query_string(self):
+        first = self.get('/api/recipes/?page=1&limit=1')
+        self.assertEqual(
+            self.get('/api/recipes/?page=1&limit=1', first['ETag'])
+            .status_code, 304)
+
+        second = self.get('/api/recipes/?page=2&limit=1', first['ETag'])
+
+        self.assertEqual(second.status_code, 200)
+        self.assertNotEqual(second['ETag'], first['ETag'])
+        self.assertNotEqual(second.json()['results'],
+                            first.json()['results'])
+
+    def test_renderer(self):
+        first = self.get('/api/tags/')
+
+        response = self.get(
+            '/api/tags/', first['ETag'], HTTP_ACCEPT='text/html')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        self.assertIn('Accept', response['Vary'])
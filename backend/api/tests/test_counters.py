@@ -0,0 +1,82 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from api import cache as cache_module
+from .factories import (MediaTestCase, create_catalog, create_recipe,
+                        create_user)
+
+POPULAR = '/api/recipes/?ordering=-favorites_count,-pub_date'
+
+
+class CounterOrderingTest(MediaTestCase):
+    """Списки с сортировкой по счетчикам кешируются ненадолго и без
+    ETag, а изменение счетчиков не меняет общих версий."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog()
+        cls.author = create_user(0)
+        cls.recipes = [
+            create_recipe(cls.author, tags[:1], ingredients[:2], number)
+            for number in range(3)]
+
+    def setUp(self):
+        super().setUp()
+        self.anonymous = APIClient()
+        self.user = APIClient()
+        self.user.force_authenticate(create_user(1))
+
+    def get_ids(self, response):
+        return [recipe['id'] for recipe in response.json()['results']]
+
+    def test_popular_list_has_no_etag(self):
+        response = self.anonymous.get(POPULAR)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn('ETag', response)
+
+    def test_favorite_does_not_bump_versions(self):
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.user.post(
+                f'/api/recipes/{self.recipes[0].pk}/favorite/'
+            ).status_code, 201)
+        # Версия меняется только у пользователя, общей строки версии
+        # счетчиков, блокируемой каждой записью, нет.
+        bumps = [query['sql'] for query in context
+                 if 'recipes_contentversion' in query['sql']]
+        self.assertTrue(bumps)
+        self.assertTrue(all("'user:" in sql for sql in bumps), bumps)
+
+    @override_settings(COUNTER_LIST_CACHE_TIMEOUT=30)
+    def test_popular_list_expires_by_timeout(self):
+        self.anonymous.get(POPULAR)
+        self.user.post(f'/api/recipes/{self.recipes[0].pk}/favorite/')
+        with mock.patch.object(cache_module, 'set') as cache_set:
+            cache.clear()
+            response = self.anonymous.get(POPULAR)
+        self.assertEqual(self.get_ids(response)[0], self.recipes[0].pk)
+        self.assertEqual(cache_set.call_args.args[2], 30)
+
+    def test_batch_remove_changes_popular_list(self):
+        self.user.post('/api/recipes/favorite/',
+                       {'recipes': [self.recipes[0].pk]}, format='json')
+        self.assertEqual(
+            self.get_ids(self.anonymous.get(POPULAR))[0], self.recipes[0].pk)
+
+        self.user.delete('/api/recipes/favorite/',
+                         {'recipes': [self.recipes[0].pk]}, format='json')
+
+        cache.clear()
+        self.assertEqual(
+            self.get_ids(self.anonymous.get(POPULAR))[-1], self.recipes[0].pk)
+
+    def test_default_ordering_ignores_counters(self):
+        first = self.anonymous.get('/api/recipes/')
+        self.user.post(f'/api/recipes/{self.recipes[0].pk}/favorite/')
+        response = self.anonymous.get(
+            '/api/recipes/', HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 304)
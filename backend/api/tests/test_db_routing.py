@@ -0,0 +1,105 @@
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connections
+from django.test import TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from api.db_routing import PIN_COOKIE
+from .factories import create_catalog, create_recipe, create_user
+
+# Зеркало основной базы есть в foodgram_backend.test_settings.
+HAS_REPLICA = 'replica' in settings.DATABASES
+
+
+@skipUnless(HAS_REPLICA, 'нужны настройки foodgram_backend.test_settings')
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTest(TransactionTestCase):
+    """Безопасные запросы читают реплику, запись и чтение после нее идут
+    в основную базу.
+
+    Внутри транзакции TestCase маршрутизатор всегда выбирает основную
+    базу, поэтому тест работает с зафиксированными данными.
+    """
+
+    databases = {'default', 'replica'} if HAS_REPLICA else {'default'}
+
+    def setUp(self):
+        cache.clear()
+        tags, ingredients = create_catalog()
+        self.user = create_user(0)
+        self.recipe = create_recipe(
+            self.user, tags[:1], ingredients[:2], image=False)
+        self.client = APIClient()
+        self.client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=self.user)}')
+
+    def request(self, method, url):
+        with CaptureQueriesContext(connections['default']) as default, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            response = getattr(self.client, method)(url)
+        self.assertLess(response.status_code, 400)
+        return ([query['sql'] for query in default],
+                [query['sql'] for query in replica])
+
+    def assert_reads_recipes(self, queries):
+        self.assertTrue(any(
+            'FROM "recipes_recipe"' in sql for sql in queries), queries)
+
+    def test_safe_request_reads_replica(self):
+        default, replica = self.request('get', '/api/recipes/')
+        self.assert_reads_recipes(replica)
+        self.assertFalse(any(
+            'FROM "recipes_recipe"' in sql for sql in default), default)
+
+    def test_unsafe_request_uses_default(self):
+        default, replica = self.request(
+            'post', f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertEqual(replica, [])
+        self.assertTrue(any(
+            sql.startswith('INSERT') for sql in default), default)
+
+    def write_and_read(self):
+        self.request('post', f'/api/recipes/{self.recipe.pk}/favorite/')
+        self.assertIn(PIN_COOKIE, self.client.cookies)
+
+        default, replica = self.request('get', '/api/recipes/')
+        self.assertEqual(replica, [])
+        self.assert_reads_recipes(default)
+        del self.client.cookies[PIN_COOKIE]
+
+    @override_settings(REPLICA_PIN_CACHE=True)
+    def test_reads_default_after_write(self):
+        self.write_and_read()
+
+        # Без cookie закрепление действует по общему кешу для пользователя.
+        default, replica = self.request('get', '/api/recipes/')
+        self.assertEqual(replica, [])
+
+        # После окончания окна чтение возвращается на реплику.
+        cache.clear()
+        default, replica = self.request('get', '/api/recipes/')
+        self.assert_reads_recipes(replica)
+
+    @override_settings(REPLICA_PIN_CACHE=False)
+    def test_cookie_only_pin(self):
+        self.write_and_read()
+
+        # Кеш процесса не общий для воркеров, без cookie закрепления нет.
+        default, replica = self.request('get', '/api/recipes/')
+        self.assert_reads_recipes(replica)
+
+    @override_settings(CONN_HEALTH_CHECKS=True)
+    def test_health_check_of_used_alias(self):
+        connections['replica'].ensure_connection()
+        with mock.patch.object(
+                type(connections['default']), 'is_usable', autospec=True,
+                return_value=True) as is_usable:
+            self.request('post', f'/api/recipes/{self.recipe.pk}/favorite/')
+        # Открытое соединение с репликой в этом запросе не проверяется.
+        self.assertEqual(
+            [call.args[0].alias for call in is_usable.call_args_list],
+            ['default'])
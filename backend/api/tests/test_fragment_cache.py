@@ -0,0 +1,56 @@
+from rest_framework.test import APIClient
+
+from .factories import (MediaTestCase, create_catalog, create_recipe,
+                        create_user)
+
+
+class AuthorVersionTest(MediaTestCase):
+    """Кеши рецептов сбрасываются только при изменении данных авторов."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog()
+        cls.author = create_user(0)
+        cls.reader = create_user(1)
+        create_recipe(cls.author, tags[:1], ingredients[:2])
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.first = self.client.get('/api/recipes/')
+        self.assertEqual(self.first.status_code, 200)
+
+    def assert_not_modified(self):
+        response = self.client.get(
+            '/api/recipes/', HTTP_IF_NONE_MATCH=self.first['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_signup(self):
+        response = self.client.post('/api/users/', {
+            'email': 'new@example.com', 'username': 'new',
+            'first_name': 'Новый', 'last_name': 'Пользователь',
+            'password': 'Pass12345!x'})
+        self.assertEqual(response.status_code, 201)
+        self.assert_not_modified()
+        self.assertEqual(self.client.get('/api/recipes/')['X-Cache'], 'HIT')
+
+    def test_user_without_recipes(self):
+        self.reader.first_name = 'Читатель'
+        self.reader.save()
+        self.assert_not_modified()
+
+    def test_author_password(self):
+        self.author.set_password('Other12345!x')
+        self.author.save(update_fields=('password',))
+        self.assert_not_modified()
+
+    def test_author_profile(self):
+        self.author.first_name = 'Автор'
+        self.author.save()
+
+        response = self.client.get(
+            '/api/recipes/', HTTP_IF_NONE_MATCH=self.first['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            response.json()['results'][0]['author']['first_name'], 'Автор')
@@ -0,0 +1,85 @@
+import base64
+from unittest import mock
+
+from django.core.files.storage import default_storage
+from rest_framework.test import APIClient
+
+from recipes import images
+from recipes.models import Recipe
+from .factories import (PNG, MediaTestCase, create_catalog, create_recipe,
+                        create_user)
+
+
+class ImageVariantsTest(MediaTestCase):
+    """Варианты замененного изображения удаляются после построения
+    новых."""
+
+    def setUp(self):
+        super().setUp()
+        tags, ingredients = create_catalog()
+        self.user = create_user(0)
+        self.recipe = create_recipe(self.user, tags[:1], ingredients[:1])
+        # Задачи пула выполняются сразу в потоке теста.
+        for patcher in (
+                mock.patch.object(images, 'close_old_connections'),
+                mock.patch.object(
+                    images.executor, 'submit',
+                    side_effect=lambda function, *args: function(*args))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        images.build_variants(self.recipe.pk)
+        self.recipe.refresh_from_db()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def update_image(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f'/api/recipes/{self.recipe.pk}/', {
+                    'image': 'data:image/png;base64,'
+                             + base64.b64encode(PNG).decode(),
+                    'tags': [tag.pk for tag in self.recipe.tags.all()],
+                    'ingredients': [
+                        {'id': item.ingredient_id, 'amount': item.amount}
+                        for item in self.recipe.recipe_ingredients.all()],
+                    'name': self.recipe.name, 'text': self.recipe.text,
+                    'cooking_time': self.recipe.cooking_time,
+                }, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        return Recipe.objects.get(pk=self.recipe.pk)
+
+    def test_replace(self):
+        old = list(self.recipe.image_variants.values())
+        self.assertTrue(all(default_storage.exists(name) for name in old))
+
+        recipe = self.update_image()
+
+        self.assertEqual(
+            recipe.image_variants.keys(), images.IMAGE_VARIANTS.keys())
+        self.assertTrue(all(default_storage.exists(name)
+                            for name in recipe.image_variants.values()))
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+
+    def test_replaced_again(self):
+        render_variants = images.render_variants
+        rendered = []
+
+        def render_and_replace(name):
+            variants = render_variants(name)
+            rendered.extend(variants.values())
+            # Пока строились варианты, изображение сменилось еще раз.
+            Recipe.objects.filter(pk=self.recipe.pk).update(
+                image='api/media/other.png')
+            return variants
+
+        with mock.patch.object(
+                images, 'render_variants', side_effect=render_and_replace):
+            images.build_variants(
+                self.recipe.pk, self.recipe.image_variants.values())
+
+        self.assertEqual(len(rendered), len(images.IMAGE_VARIANTS))
+        self.assertFalse(any(default_storage.exists(name) for name in [
+            *rendered, *self.recipe.image_variants.values()]))
+        self.assertEqual(
+            Recipe.objects.get(pk=self.recipe.pk).image_variants,
+            self.recipe.image_variants)
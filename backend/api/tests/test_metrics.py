@@ -0,0 +1,62 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+from django.test import SimpleTestCase, override_settings
+
+from api import metrics
+
+ENDPOINT = 'MetricsTest.endpoint'
+
+
+def finished_pid():
+    process = subprocess.Popen([sys.executable, '-c', ''])
+    process.wait()
+    return process.pid
+
+
+class MetricsTest(SimpleTestCase):
+    """Метрики воркеров суммируются через общую папку."""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        metrics.n_plus_one.values.pop(ENDPOINT, None)
+        metrics.observe(ENDPOINT, 0.01, 0.001, 20, 20, 10)
+
+    def counter(self, text):
+        line = (f'foodgram_n_plus_one_requests_total'
+                f'{{endpoint="{ENDPOINT}"}} ')
+        return [int(row[len(line):]) for row in text.splitlines()
+                if row.startswith(line)]
+
+    def test_process(self):
+        text = metrics.render()
+        self.assertEqual(self.counter(text), [1])
+        self.assertIn('foodgram_auth_token_cache_requests ', text)
+
+    def test_workers(self):
+        pid = finished_pid()
+        with open(os.path.join(self.directory, f'{pid}.json'), 'w') as file:
+            json.dump({'metrics': {metrics.n_plus_one.name: {ENDPOINT: 5}},
+                       'gauges': {}}, file)
+
+        with override_settings(METRICS_DIR=self.directory):
+            first = metrics.render()
+            metrics.observe(ENDPOINT, 0.01, 0.001, 20, 20, 10)
+            second = metrics.render()
+
+        # Счетчики завершенного воркера остаются в сумме.
+        self.assertEqual(self.counter(first), [6])
+        self.assertEqual(self.counter(second), [7])
+        self.assertEqual(sorted(os.listdir(self.directory)),
+                         sorted([metrics.ARCHIVE, f'{os.getpid()}.json',
+                                 'lock']))
+        self.assertIn(
+            f'foodgram_auth_token_cache_requests{{worker="{os.getpid()}"}}',
+            second)
+        self.assertEqual(
+            second.count('# TYPE foodgram_auth_token_cache_requests'), 1)
@@ -0,0 +1,73 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from users.models import Subscription
+from .factories import (MediaTestCase, create_catalog, create_recipe,
+                        create_user)
+
+
+class CursorPaginationTest(MediaTestCase):
+    """Курсорные страницы ищут по всем полям сортировки без OFFSET."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog()
+        cls.user = create_user(0)
+        cls.authors = [create_user(number) for number in range(1, 6)]
+        for number in range(7):
+            create_recipe(cls.authors[number % 5], tags[:1],
+                          ingredients[:1], number)
+        # Одинаковая дата публикации у всех рецептов.
+        Recipe.objects.update(pub_date=timezone.now())
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.user, subscribe=author)
+            for author in cls.authors)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def walk(self, url, link='next'):
+        ids = []
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any(
+                'OFFSET' in query['sql'] for query in queries))
+            page = [item['id'] for item in response.json()['results']]
+            ids += page if link == 'next' else page[::-1]
+            url = response.json()[link]
+            last = response
+        return ids, last
+
+    def test_recipes_with_equal_pub_date(self):
+        expected = list(Recipe.objects.order_by(
+            '-pub_date', '-id').values_list('id', flat=True))
+        ids, last = self.walk('/api/recipes/?pagination=cursor&limit=2')
+        self.assertEqual(ids, expected)
+
+        back, _ = self.walk(last.json()['previous'], link='previous')
+        self.assertEqual(back[::-1], expected[:-1])
+
+    def test_ordering_by_counter_ties(self):
+        expected = list(Recipe.objects.order_by(
+            '-favorites_count', '-id').values_list('id', flat=True))
+        ids, _ = self.walk(
+            '/api/recipes/?pagination=cursor&limit=3'
+            '&ordering=-favorites_count')
+        self.assertEqual(ids, expected)
+
+    def test_subscriptions(self):
+        ids, _ = self.walk(
+            '/api/users/subscriptions/?pagination=cursor&limit=2')
+        self.assertEqual(ids, [author.pk for author in sorted(
+            self.authors, key=lambda author: author.username)])
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/recipes/?cursor=cD1bMV0%3D')
+        self.assertEqual(response.status_code, 404)
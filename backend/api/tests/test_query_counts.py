@@ -0,0 +1,67 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, ShoppingCart
+from users.models import Subscription
+from .factories import (MediaTestCase, create_catalog, create_recipe,
+                        create_user)
+
+
+class QueryCountTest(MediaTestCase):
+    """Число запросов списков не зависит от размера страницы."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog()
+        cls.user = create_user(0)
+        cls.authors = [create_user(number) for number in range(1, 13)]
+        for number in range(60):
+            recipe = create_recipe(
+                cls.authors[number % len(cls.authors)],
+                tags[:1 + number % 3], ingredients[number % 5:][:3],
+                number=number, image=number % 7 != 0)
+            if number % 2:
+                Favorite.objects.create(user=cls.user, recipe=recipe)
+            if number % 3:
+                ShoppingCart.objects.create(user=cls.user, recipe=recipe)
+        Subscription.objects.bulk_create(
+            Subscription(user=cls.user, subscribe=author)
+            for author in cls.authors)
+
+    def setUp(self):
+        super().setUp()
+        self.anonymous = APIClient()
+        self.authorized = APIClient()
+        self.authorized.force_authenticate(self.user)
+
+    def get(self, client, path, results):
+        cache.clear()
+        response = client.get(path)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['results']), results)
+
+    def assertConstantQueries(self, client, path, small, large):
+        with CaptureQueriesContext(connection) as queries:
+            self.get(client, path.format(limit=small), small)
+        with self.assertNumQueries(len(queries)):
+            self.get(client, path.format(limit=large), large)
+
+    def test_recipe_list_anonymous(self):
+        self.assertConstantQueries(
+            self.anonymous, '/api/recipes/?limit={limit}', 1, 50)
+
+    def test_recipe_list_authorized(self):
+        self.assertConstantQueries(
+            self.authorized, '/api/recipes/?limit={limit}', 1, 50)
+
+    def test_recipe_list_cursor(self):
+        self.assertConstantQueries(
+            self.authorized,
+            '/api/recipes/?pagination=cursor&limit={limit}', 1, 50)
+
+    def test_subscriptions(self):
+        self.assertConstantQueries(
+            self.authorized,
+            '/api/users/subscriptions/?recipes_limit=2&limit={limit}', 1, 12)
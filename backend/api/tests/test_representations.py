@@ -0,0 +1,114 @@
+import json
+
+from django.db.models import Count, OuterRef, Prefetch, Subquery, Value
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from api import representations
+from api.renderers import FastJSONRenderer
+from api.serializers import CustomUserFullSerializer, RecipeSerializer
+from recipes.images import render_variants
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+from .factories import (MediaTestCase, User, create_catalog, create_recipe,
+                        create_user)
+
+
+class RepresentationParityTest(MediaTestCase):
+    """Представления из values() побайтно совпадают с выводом
+    сериализаторов DRF."""
+
+    @classmethod
+    def setUpTestData(cls):
+        tags, ingredients = create_catalog()
+        cls.user = create_user(0)
+        authors = [create_user(number) for number in range(1, 4)]
+        cls.recipes = [
+            create_recipe(author, tags[number % 3:], ingredients[number:],
+                          number, image=number % 2 == 0)
+            for number, author in enumerate(authors * 2)]
+        create_recipe(cls.user, tags[:1], [], 6, image=False)
+        # Варианты строятся в пуле после фиксации транзакции, здесь - для
+        # части рецептов с изображением.
+        for recipe in cls.recipes[::4]:
+            Recipe.objects.filter(pk=recipe.pk).update(
+                image_variants=render_variants(recipe.image.name))
+        Favorite.objects.create(user=cls.user, recipe=cls.recipes[0])
+        ShoppingCart.objects.create(user=cls.user, recipe=cls.recipes[1])
+        for author in authors[:2]:
+            Subscription.objects.create(user=cls.user, subscribe=author)
+
+    def setUp(self):
+        super().setUp()
+        self.request = Request(APIRequestFactory().get('/api/'))
+        self.request.user = self.user
+
+    def assertPage(self, response, results):
+        """Проверяет, что тело ответа API побайтно равно странице с
+        results, отрендеренной JSONRenderer."""
+        self.assertEqual(response.content, JSONRenderer().render(
+            {**response.data, 'results': results}))
+
+    def test_recipes(self):
+        queryset = Recipe.objects.with_user_flags(self.user).order_by(
+            '-pub_date', '-id')
+        serialized = RecipeSerializer(
+            queryset.with_related(), many=True,
+            context={'request': self.request}).data
+        expected = JSONRenderer().render(serialized)
+        data = representations.get_recipes(
+            [recipe.pk for recipe in queryset], self.request)
+        results = []
+        for recipe in queryset:
+            data[recipe.pk]['is_favorited'] = recipe.is_favorited
+            data[recipe.pk]['is_in_shopping_cart'] = (
+                recipe.is_in_shopping_cart)
+            results.append(data[recipe.pk])
+
+        self.assertEqual(FastJSONRenderer().render(results), expected)
+        expected = json.loads(expected)
+        self.assertEqual(
+            {(recipe['image'] is None,
+              recipe['image_variants']['thumbnail'] == recipe['image'])
+             for recipe in expected},
+            {(True, True), (False, True), (False, False)})
+        self.assertTrue(any(
+            recipe['author']['is_subscribed'] for recipe in expected))
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get('/api/recipes/', {'limit': 50})
+        self.assertPage(response, serialized)
+
+    def test_subscriptions(self):
+        recipes_limit = 1
+        authors = User.objects.filter(subscribe__user=self.user).annotate(
+            recipes_count=Count('recipes')).order_by('username')
+        recipes = Recipe.objects.filter(pk__in=Subquery(
+            Recipe.objects.filter(author=OuterRef('author')).values(
+                'pk')[:recipes_limit]))
+        serialized = CustomUserFullSerializer(
+            authors.annotate(is_subscribed=Value(True)).prefetch_related(
+                Prefetch('recipes', queryset=recipes,
+                         to_attr='limited_recipes')),
+            many=True, context={'request': self.request}).data
+        expected = JSONRenderer().render(serialized)
+
+        actual = FastJSONRenderer().render(
+            representations.get_subscriptions(
+                authors.values(*representations.USER_FIELDS,
+                               'recipes_count'), recipes))
+
+        self.assertEqual(actual, expected)
+        expected = json.loads(expected)
+        self.assertEqual(
+            [len(author['recipes']) for author in expected], [1, 1])
+        self.assertEqual(
+            [author['recipes_count'] for author in expected], [2, 2])
+
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.get(
+            '/api/users/subscriptions/', {'recipes_limit': recipes_limit})
+        self.assertPage(response, serialized)
@@ -0,0 +1,83 @@
+from django.db import connection
+
+from recipes import shopping_list
+from recipes.models import RecipeIngredient, ShoppingCart, ShoppingListItem
+from .factories import (MediaTestCase, create_catalog, create_recipe,
+                        create_user)
+
+
+class AdminShoppingListTest(MediaTestCase):
+    """Правка ингредиентов в админке обновляет списки покупок."""
+
+    def test_inline_changes_update_carts(self):
+        tags, ingredients = create_catalog()
+        admin = create_user(0, is_staff=True, is_superuser=True)
+        buyer = create_user(1)
+        recipe = create_recipe(admin, tags[:1], ingredients[:3])
+        ShoppingCart.objects.create(user=buyer, recipe=recipe)
+        shopping_list.add_recipe(buyer, recipe)
+        rows = list(recipe.recipe_ingredients.order_by('pk'))
+        data = {
+            'name': recipe.name,
+            'author': admin.pk,
+            'text': recipe.text,
+            'cooking_time': recipe.cooking_time,
+            'tags': [tags[0].pk],
+            'recipe_ingredients-TOTAL_FORMS': 4,
+            'recipe_ingredients-INITIAL_FORMS': 3,
+            'recipe_ingredients-MIN_NUM_FORMS': 1,
+            'recipe_ingredients-MAX_NUM_FORMS': 1000,
+        }
+        for index, row in enumerate(rows):
+            data.update({
+                f'recipe_ingredients-{index}-id': row.pk,
+                f'recipe_ingredients-{index}-recipe': recipe.pk,
+                f'recipe_ingredients-{index}-ingredient': row.ingredient_id,
+                f'recipe_ingredients-{index}-amount': row.amount,
+            })
+        data['recipe_ingredients-0-amount'] = 10
+        data['recipe_ingredients-1-DELETE'] = 'on'
+        data.update({
+            'recipe_ingredients-3-recipe': recipe.pk,
+            'recipe_ingredients-3-ingredient': ingredients[5].pk,
+            'recipe_ingredients-3-amount': 7,
+        })
+        self.client.force_login(admin)
+
+        response = self.client.post(
+            f'/admin/recipes/recipe/{recipe.pk}/change/', data)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(
+            dict(RecipeIngredient.objects.filter(
+                recipe=recipe).values_list('ingredient_id', 'amount')),
+            {ingredients[0].pk: 10, ingredients[2].pk: 3,
+             ingredients[5].pk: 7})
+        self.assertEqual(shopping_list.find_inconsistencies(), [])
+
+
+class ApplyDeltasTest(MediaTestCase):
+    """Параллельное добавление нового ингредиента не падает на
+    уникальности (user, ingredient)."""
+
+    def test_row_created_concurrently(self):
+        tags, ingredients = create_catalog()
+        user = create_user(0)
+        recipe = create_recipe(user, tags[:1], ingredients[:1])
+        inserted = []
+
+        def insert_first(execute, sql, params, many, context):
+            # Другая транзакция создает ту же строку между проверкой
+            # существующих строк и вставкой.
+            if (not inserted and sql.startswith('INSERT')
+                    and 'recipes_shoppinglistitem' in sql):
+                inserted.append(sql)
+                ShoppingListItem.objects.create(
+                    user=user, ingredient=ingredients[0], total_amount=5)
+            return execute(sql, params, many, context)
+
+        with connection.execute_wrapper(insert_first):
+            shopping_list.add_recipe(user, recipe)
+
+        self.assertEqual(ShoppingListItem.objects.get(
+            user=user, ingredient=ingredients[0]).total_amount, 6)
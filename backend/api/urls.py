@@ -1,8 +1,10 @@
+from django.conf import settings
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (CustomUserViewSet, IngredientViewSet, RecipeViewSet,
-                    SubscriveViewSet, TagsViewSet)
+from .async_views import async_patterns
+from .views import (CustomUserViewSet, IngredientViewSet, MetricsView,
+                    RecipeViewSet, SubscriveViewSet, TagsViewSet)
 
 router = DefaultRouter()
 
@@ -17,7 +19,19 @@ router.register(r'users/subscriptions',
                 basename='subscriptions')
 router.register('users', CustomUserViewSet, basename='users')
 
+ASYNC_ROUTES = {
+    'recipes-list',
+    'recipes-detail',
+    'recipes-download-shopping-cart',
+    'ingredients-list',
+}
+
+router_urls = router.urls
+if settings.ASYNC_VIEWS:
+    router_urls = async_patterns(router_urls, ASYNC_ROUTES)
+
 urlpatterns = [
-    path('', include(router.urls)),
+    path('', include(router_urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('_metrics', MetricsView.as_view(), name='metrics'),
 ]
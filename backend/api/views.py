@@ -1,35 +1,54 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import Sum
-from django.http import HttpResponse
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.http import HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
-from rest_framework.permissions import (AllowAny, IsAuthenticated,
+from rest_framework.filters import OrderingFilter
+from rest_framework.permissions import (AllowAny, IsAdminUser,
+                                        IsAuthenticated,
                                         IsAuthenticatedOrReadOnly)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
-from api.serializers import (CustomUserFullSerializer,
-                             CustomUserShortSerializer, SubscribeSerializer)
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
+from api.serializers import (CustomUserShortSerializer, SubscribeSerializer,
+                             get_recipes_limit, get_subscribed_ids,
+                             update_subscribed_ids)
+from recipes import shopping_list, versions
+from recipes.models import (Favorite, Ingredient, Recipe, ShoppingCart,
+                            ShoppingListItem, Tag, add_user_recipes,
+                            remove_user_recipes)
+from recipes.search import ingredient_index
 from users.models import Subscription
-from .filters import IngredientNameFilter, RecipeFilter
-from .mixins import CreateListDestroyViewSet
+from . import metrics, representations
+from .db_routing import ReplicaReadMixin
+from .exporters import ExporterContentNegotiation, get_exporter
+from .filters import RecipeFilter, RecipeSearchFilter
+from .mixins import (AnonymousListCacheMixin, ConditionalGetMixin,
+                     CreateListDestroyViewSet, FragmentCacheMixin)
+from .pagination import (CursorLimitPagination, SubscriptionPagination,
+                         SwitchablePagination)
 from .permissions import IsAdminOrAuthorOrReadOnly
+from .renderers import FAST_RENDERER_CLASSES
 from .serializers import (FavoriteSerializer, IngredientSerializer,
-                          RecipeCreateUpdateSerializer, RecipeSerializer,
-                          ShoppingCartSerializer, TagSerializer)
+                          RecipeCreateUpdateSerializer, RecipeIdsSerializer,
+                          RecipeSerializer, ShoppingCartSerializer,
+                          ShortRecipeSerializer, TagSerializer)
 
 User = get_user_model()
 
 
-class CustomUserViewSet(UserViewSet):
+class CustomUserViewSet(ReplicaReadMixin, ConditionalGetMixin, UserViewSet):
     """Вьюсет для работы с пользователями."""
 
     queryset = User.objects.all()
+    version_keys = (versions.USERS,)
+    personalized = True
     serializer_class = CustomUserShortSerializer
     permission_classes = (IsAuthenticatedOrReadOnly, )
 
@@ -44,6 +63,8 @@ class SubscriveViewSet(CreateListDestroyViewSet):
 
     serializer_class = SubscribeSerializer
     permission_classes = (IsAuthenticated, )
+    pagination_class = SubscriptionPagination
+    renderer_classes = FAST_RENDERER_CLASSES
 
     def get_queryset(self):
         """Метод получения подписчиков пользователя."""
@@ -51,12 +72,21 @@ class SubscriveViewSet(CreateListDestroyViewSet):
 
     def list(self, request, *args, **kwargs):
         """Метод вывода списка подписчиков пользователя."""
+        recipes = Recipe.objects.all()
+        recipes_limit = get_recipes_limit(request)
+        if recipes_limit is not None:
+            recipes = recipes.filter(pk__in=Subquery(
+                Recipe.objects.filter(
+                    author=OuterRef('author')).values('pk')[:recipes_limit]))
         queryset = self.filter_queryset(User.objects.filter(
-            subscribe__user=self.request.user))
+            subscribe__user=self.request.user
+        ).annotate(
+            recipes_count=Count('recipes')
+        ).order_by('username').values(
+            *representations.USER_FIELDS, 'recipes_count'))
         page = self.paginate_queryset(queryset)
-        serializer = CustomUserFullSerializer(
-            page, many=True, context={'request': request})
-        return self.get_paginated_response(serializer.data)
+        return self.get_paginated_response(
+            representations.get_subscriptions(page, recipes))
 
     def create(self, request, *args, **kwargs):
         """Метод создания подписки."""
@@ -66,52 +96,164 @@ class SubscriveViewSet(CreateListDestroyViewSet):
             context={'request': request})
         serializer.is_valid(raise_exception=True)
         serializer.save()
+        update_subscribed_ids(request, subscribe.id, subscribed=True)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     def delete(self, request, *args, **kwargs):
         """Метод удаления подписки."""
-        get_object_or_404(User, id=kwargs['user_id'])
+        author = get_object_or_404(User, id=kwargs['user_id'])
         subscription, _ = Subscription.objects.filter(
             user=request.user, subscribe__id=kwargs['user_id']).delete()
         if not subscription:
             raise ValidationError('Данной подписки не существует')
+        update_subscribed_ids(request, author.id, subscribed=False)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class TagsViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                  viewsets.ReadOnlyModelViewSet):
     """Вьюсет для работы с моделью тега."""
 
     queryset = Tag.objects.all()
+    version_keys = (versions.TAGS,)
     serializer_class = TagSerializer
     permission_classes = (AllowAny,)
     pagination_class = None
 
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                        viewsets.ReadOnlyModelViewSet):
     """Вьюсет для работы с моделью ингредиента."""
 
     queryset = Ingredient.objects.all()
+    version_keys = (versions.INGREDIENTS,)
     serializer_class = IngredientSerializer
+    renderer_classes = FAST_RENDERER_CLASSES
     permission_classes = (AllowAny,)
     pagination_class = None
-    filter_backends = (DjangoFilterBackend,)
-    filterset_class = IngredientNameFilter
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(
+            self.search, request, *args, **kwargs)
+
+    def search(self, request, *args, **kwargs):
+        """Метод поиска ингредиентов по индексу в памяти."""
+        try:
+            limit = int(request.query_params['limit'])
+        except (KeyError, ValueError):
+            limit = None
+        version, _ = self.content_versions.get(
+            versions.INGREDIENTS, (None, None))
+        return Response(ingredient_index.search(
+            request.query_params.get('name', ''),
+            limit=limit if limit and limit > 0 else None,
+            version=version))
 
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(ReplicaReadMixin, ConditionalGetMixin,
+                    AnonymousListCacheMixin, FragmentCacheMixin,
+                    viewsets.ModelViewSet):
     """Вьюсет для работы с моделью рецепта."""
 
-    http_method_not_allowed = ('PUT',)
+    http_method_names = ('get', 'post', 'patch', 'delete', 'head', 'options')
     queryset = Recipe.objects.all()
+    version_keys = (versions.RECIPES, versions.TAGS, versions.INGREDIENTS,
+                    versions.AUTHORS)
+    personalized = True
     permission_classes = (IsAdminOrAuthorOrReadOnly,)
-    filter_backends = (DjangoFilterBackend,)
+    pagination_class = SwitchablePagination
+    renderer_classes = FAST_RENDERER_CLASSES
+    filter_backends = (DjangoFilterBackend, OrderingFilter,
+                       RecipeSearchFilter)
     filterset_class = RecipeFilter
+    counter_fields = ('favorites_count', 'in_carts_count')
+    ordering_fields = ('pub_date', *counter_fields)
+    ordering = ('-pub_date', '-id')
+    fragment_version_keys = (versions.TAGS, versions.INGREDIENTS,
+                             versions.AUTHORS)
+    page_fields = ('id', 'author', 'updated_at', 'pub_date',
+                   'favorites_count', 'in_carts_count')
+
+    def get_queryset(self):
+        """Метод получения рецептов с флагами текущего пользователя.
+
+        Для списка загружаются только поля пагинации и флаги, остальное
+        берется из кеша фрагментов.
+        """
+        if self.action == 'list':
+            return Recipe.objects.with_user_flags(
+                self.request.user).only(*self.page_fields)
+        if self.action == 'retrieve':
+            return Recipe.objects.with_user_flags(
+                self.request.user).with_related()
+        return Recipe.objects.all()
+
+    def serialize_fragments(self, pks):
+        return representations.get_recipes(pks, self.request)
+
+    def personalize_fragment(self, recipe, data):
+        data['is_favorited'] = recipe.is_favorited
+        data['is_in_shopping_cart'] = recipe.is_in_shopping_cart
+        data['author']['is_subscribed'] = (
+            recipe.author_id in get_subscribed_ids(self.request))
+        return data
+
+    def get_version_keys(self):
+        keys = super().get_version_keys()
+        if self.action == 'retrieve':
+            keys.remove(versions.RECIPES)
+        return keys
+
+    def get_validators(self):
+        validators = super().get_validators()
+        if self.is_ordered_by_counters():
+            # Счетчики не версионируются, поэтому без ETag: такие списки
+            # устаревают только по COUNTER_LIST_CACHE_TIMEOUT.
+            return None, None
+        return validators
+
+    def get_list_cache_timeout(self):
+        if self.is_ordered_by_counters():
+            return settings.COUNTER_LIST_CACHE_TIMEOUT
+        return super().get_list_cache_timeout()
+
+    def is_ordered_by_counters(self):
+        ordering = self.request.query_params.get(
+            OrderingFilter.ordering_param, '')
+        return any(
+            field.strip().lstrip('-') in self.counter_fields
+            for field in ordering.split(','))
+
+    def change_counter(self, recipe_ids, counter, delta):
+        """Изменяет счетчик избранного или списков покупок рецептов."""
+        Recipe.objects.filter(pk__in=recipe_ids).update(
+            **{counter: F(counter) + delta})
+
+    def get_object_version(self):
+        try:
+            return Recipe.objects.filter(pk=self.kwargs['pk']).values_list(
+                'updated_at', flat=True).first()
+        except ValueError:
+            return None
 
     def get_serializer_class(self):
-        if self.action == 'create' or 'partial_update':
+        if self.action in ('create', 'partial_update'):
             return RecipeCreateUpdateSerializer
         return RecipeSerializer
 
+    @action(detail=False, methods=('GET',),
+            permission_classes=(IsAuthenticated,))
+    def feed(self, request):
+        """Метод вывода ленты рецептов авторов из подписок."""
+        return self.conditional_response(self.get_feed, request)
+
+    def get_feed(self, request):
+        queryset = Recipe.objects.feed(request.user).with_user_flags(
+            request.user).only(*self.page_fields)
+        paginator = CursorLimitPagination()
+        page = paginator.paginate_queryset(queryset, request)
+        return paginator.get_paginated_response(self.get_fragments(page))
+
     @action(detail=True,
             methods=('POST',),
             permission_classes=(IsAuthenticated, ))
@@ -121,16 +263,20 @@ class RecipeViewSet(viewsets.ModelViewSet):
             data={'recipe': pk, 'user': request.user.id},
             context={'request': request})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            self.change_counter((pk,), 'favorites_count', 1)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @favorite.mapping.delete
     def delete_favorite(self, request, pk):
         recipe = get_object_or_404(Recipe, pk=pk)
-        favorite, _ = Favorite.objects.filter(
-            user=request.user, recipe=recipe).delete()
-        if not favorite:
-            raise ValidationError('Рецепт не добавлен в избранное')
+        with transaction.atomic():
+            favorite, _ = Favorite.objects.filter(
+                user=request.user, recipe=recipe).delete()
+            if not favorite:
+                raise ValidationError('Рецепт не добавлен в избранное')
+            self.change_counter((pk,), 'favorites_count', -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=('POST',),
@@ -141,34 +287,124 @@ class RecipeViewSet(viewsets.ModelViewSet):
             data={'recipe': pk, 'user': request.user.id},
             context={'request': request})
         serializer.is_valid(raise_exception=True)
-        serializer.save()
+        with transaction.atomic():
+            serializer.save()
+            self.change_counter((pk,), 'in_carts_count', 1)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
     @shopping_cart.mapping.delete
     def delete_shopping_cart(self, request, pk):
         recipe = get_object_or_404(Recipe, pk=pk)
-        shopping_cart, _ = ShoppingCart.objects.filter(
-            user=request.user, recipe=recipe).delete()
-        if not shopping_cart:
-            raise ValidationError('Рецепт не добавлен в список покупок')
+        with transaction.atomic():
+            shopping_cart, _ = ShoppingCart.objects.filter(
+                user=request.user, recipe=recipe).delete()
+            if not shopping_cart:
+                raise ValidationError('Рецепт не добавлен в список покупок')
+            shopping_list.remove_recipe(request.user, recipe)
+            self.change_counter((pk,), 'in_carts_count', -1)
         return Response(status=status.HTTP_204_NO_CONTENT)
 
-    @action(detail=False, methods=('GET',))
+    def get_batch_ids(self, request):
+        serializer = RecipeIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        return list(dict.fromkeys(serializer.validated_data['recipes']))
+
+    def add_batch(self, request, model, counter, on_add=None):
+        """Добавляет рецепты в избранное или список покупок пакетом.
+
+        Записи вставляются одним запросом с пропуском уже существующих,
+        добавленными считаются рецепты, которые вернул этот INSERT.
+        """
+        ids = self.get_batch_ids(request)
+        recipes = Recipe.objects.filter(pk__in=ids).only(
+            'id', 'name', 'image', 'image_variants', 'cooking_time')
+        with transaction.atomic():
+            added = add_user_recipes(model, request.user.id, ids)
+            if added:
+                self.change_counter(added, counter, 1)
+                if on_add is not None:
+                    on_add(request.user, added)
+                # Вставка без ORM не отправляет сигналы.
+                versions.bump(versions.user_key(request.user.id))
+        recipes = {recipe.pk: recipe for recipe in recipes}
+        context = self.get_serializer_context()
+        results = []
+        for pk in ids:
+            recipe = recipes.get(pk)
+            if recipe is None:
+                results.append({'id': pk, 'status': 'not_found'})
+                continue
+            results.append({
+                'id': pk,
+                'status': 'added' if pk in added else 'exists',
+                'recipe': ShortRecipeSerializer(recipe, context=context).data,
+            })
+        return Response({'results': results})
+
+    def remove_batch(self, request, model, counter, on_remove=None):
+        """Убирает рецепты из избранного или списка покупок пакетом."""
+        ids = self.get_batch_ids(request)
+        with transaction.atomic():
+            removed = remove_user_recipes(model, request.user.id, ids)
+            if removed:
+                self.change_counter(removed, counter, -1)
+                if on_remove is not None:
+                    on_remove(request.user, removed)
+                # Удаление без ORM не отправляет сигналы.
+                versions.bump(versions.user_key(request.user.id))
+        return Response({'results': [
+            {'id': pk, 'status': 'removed' if pk in removed else 'missing'}
+            for pk in ids]})
+
+    @action(detail=False, methods=('POST',), url_path='favorite',
+            url_name='favorite-batch', permission_classes=(IsAuthenticated,))
+    def favorite_batch(self, request):
+        """Метод пакетного добавления рецептов в избранное."""
+        return self.add_batch(request, Favorite, 'favorites_count')
+
+    @favorite_batch.mapping.delete
+    def delete_favorite_batch(self, request):
+        return self.remove_batch(request, Favorite, 'favorites_count')
+
+    @action(detail=False, methods=('POST',), url_path='shopping_cart',
+            url_name='shopping-cart-batch',
+            permission_classes=(IsAuthenticated,))
+    def shopping_cart_batch(self, request):
+        """Метод пакетного добавления рецептов в список покупок."""
+        return self.add_batch(
+            request, ShoppingCart, 'in_carts_count',
+            on_add=shopping_list.add_recipes)
+
+    @shopping_cart_batch.mapping.delete
+    def delete_shopping_cart_batch(self, request):
+        return self.remove_batch(
+            request, ShoppingCart, 'in_carts_count',
+            on_remove=shopping_list.remove_recipes)
+
+    @action(detail=False, methods=('GET',),
+            permission_classes=(IsAuthenticated,),
+            content_negotiation_class=ExporterContentNegotiation)
     def download_shopping_cart(self, request):
         """Метод отправляющий список покупок пользователю."""
-        shopping_cart = RecipeIngredient.objects.filter(
-            recipe__shopping_carts__user=request.user).values(
-                'ingredient__name', 'ingredient__measurement_unit').annotate(
-                    ingredient_sum=Sum('amount'))
-        cart = 'Список покупок:\n'
-        counter = 0
-        for ingredient in shopping_cart:
-            counter += 1
-            cart += (f"{counter}) {ingredient['ingredient__name']}"
-                     f" ({ingredient['ingredient__measurement_unit']}) - "
-                     f"{ingredient['ingredient_sum']} \n"
-                     )
-        response = HttpResponse(cart, content_type='text/plain')
-        response['Content-Disposition'] = ('attachment;'
-                                           'filename="shopping_cart.txt"')
+        exporter = get_exporter(request.query_params.get('format'))
+        shopping_cart = ShoppingListItem.objects.filter(
+            user=request.user).values(
+                'ingredient__name', 'ingredient__measurement_unit',
+                ingredient_sum=F('total_amount')).order_by('ingredient__name')
+        response = StreamingHttpResponse(
+            exporter.stream(shopping_cart.iterator()),
+            content_type=exporter.content_type)
+        response['Content-Disposition'] = (
+            f'attachment;filename="{exporter.filename}"')
         return response
+
+
+class MetricsView(APIView):
+    """Метрики запросов процесса в формате Prometheus для персонала."""
+
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return HttpResponse(
+            metrics.render(),
+            content_type='text/plain; version=0.0.4; charset=utf-8')
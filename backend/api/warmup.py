@@ -0,0 +1,53 @@
+import time
+
+from django.urls import resolve, reverse
+from djoser.conf import settings as djoser_settings
+from rest_framework.settings import IMPORT_STRINGS, api_settings
+
+from recipes import versions
+from recipes.search import ingredient_index
+from recipes.tags import get_tag_map
+
+
+def load_catalogs():
+    get_tag_map(refresh=True)
+    version, _ = versions.get_versions(
+        (versions.INGREDIENTS,))[versions.INGREDIENTS]
+    ingredient_index.search('', version=version)
+
+
+def compile_urls():
+    resolve(reverse('recipes-list'))
+
+
+def import_settings():
+    # Классы из настроек DRF и djoser импортируются при первом обращении
+    # и сохраняются в объектах настроек, которые воркеры получают при fork.
+    for name in IMPORT_STRINGS:
+        getattr(api_settings, name)
+    for group in (djoser_settings.SERIALIZERS, djoser_settings.PERMISSIONS):
+        for name in group:
+            getattr(group, name)
+
+
+STEPS = (
+    ('catalogs', load_catalogs),
+    ('urls', compile_urls),
+    ('imports', import_settings),
+)
+
+
+def warm_up():
+    """Прогревает процесс до приема запросов.
+
+    Загружает справочники тегов и ингредиентов, компилирует URLconf и
+    импортирует классы из настроек DRF и djoser. Поля сериализаторов не
+    строятся: они заново создаются для каждого экземпляра. Возвращает
+    длительность шагов в секундах.
+    """
+    timings = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        step()
+        timings[name] = time.perf_counter() - started
+    return timings
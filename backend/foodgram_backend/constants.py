@@ -3,3 +3,6 @@ MEDIUM_FIELD_LENGTH = 200
 EXTENDED_FIELD_LENGTH = 254
 MIN_VALIDATOR_NUM = 1
 MAX_VALIDATOR_NUM = 32000
+PAGE_SIZE = 6
+MAX_PAGE_SIZE = 100
+MAX_BATCH_SIZE = 100
@@ -39,6 +39,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.QueryMetricsMiddleware',
+    'api.db_routing.PrimaryPinMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram_backend.urls'
@@ -68,10 +70,69 @@ DATABASES = {
         'USER': os.getenv('POSTGRES_USER', 'foodgram_user'),
         'PASSWORD': os.getenv('POSTGRES_PASSWORD', ''),
         'HOST': os.getenv('DB_HOST', ''),
-        'PORT': os.getenv('DB_PORT', 5432)
+        'PORT': os.getenv('DB_PORT', 5432),
+        'CONN_MAX_AGE': int(os.getenv('CONN_MAX_AGE', 60)),
     }
 }
 
+# Реплики для чтения: хосты PostgreSQL или пути к файлам SQLite.
+DATABASE_REPLICAS = []
+for number, replica in enumerate(
+        filter(None, os.getenv('DB_REPLICAS', '').split(',')), start=1):
+    alias = f'replica_{number}'
+    DATABASES[alias] = {
+        **DATABASES['default'],
+        ('NAME' if 'sqlite' in DATABASES['default']['ENGINE']
+         else 'HOST'): replica.strip(),
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['api.db_routing.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.getenv('REPLICA_PIN_SECONDS', 10))
+CONN_HEALTH_CHECKS = os.getenv('CONN_HEALTH_CHECKS', 'False') == 'True'
+
+CACHE_BACKENDS = {
+    'locmem': ('django.core.cache.backends.locmem.LocMemCache', 'foodgram'),
+    'file': ('django.core.cache.backends.filebased.FileBasedCache',
+             os.path.join(BASE_DIR, 'cache')),
+}
+
+CACHE_BACKEND, CACHE_LOCATION = CACHE_BACKENDS[
+    os.getenv('CACHE_BACKEND', 'locmem')]
+
+CACHES = {
+    'default': {
+        'BACKEND': CACHE_BACKEND,
+        'LOCATION': os.getenv('CACHE_LOCATION', CACHE_LOCATION),
+    }
+}
+
+# Закрепление пользователя за основной базой хранится в кеше только для
+# общего кеша (file): в locmem его увидел бы лишь один воркер, поэтому
+# там работает только cookie.
+REPLICA_PIN_CACHE = CACHE_BACKEND != CACHE_BACKENDS['locmem'][0]
+
+RECIPE_LIST_CACHE_TIMEOUT = int(os.getenv('RECIPE_LIST_CACHE_TIMEOUT', 300))
+# Списки с сортировкой по счетчикам избранного и списков покупок не
+# версионируются: счетчики меняются слишком часто.
+COUNTER_LIST_CACHE_TIMEOUT = int(os.getenv('COUNTER_LIST_CACHE_TIMEOUT', 30))
+FRAGMENT_CACHE_TIMEOUT = int(os.getenv('FRAGMENT_CACHE_TIMEOUT', 3600))
+
+# Кеш токенов в воркере: отзыв токена доходит до других воркеров не
+# позднее чем через AUTH_TOKEN_CACHE_TTL секунд. Размер 0 отключает кеш.
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv('AUTH_TOKEN_CACHE_SIZE', 1024))
+AUTH_TOKEN_CACHE_TTL = int(os.getenv('AUTH_TOKEN_CACHE_TTL', 10))
+
+QUERY_REPEAT_THRESHOLD = int(os.getenv('QUERY_REPEAT_THRESHOLD', 10))
+QUERY_REPEAT_WARNINGS = os.getenv('QUERY_REPEAT_WARNINGS', 'False') == 'True'
+# Общая папка, через которую /api/_metrics суммирует метрики воркеров.
+METRICS_DIR = os.getenv('METRICS_DIR', '')
+
+ASYNC_VIEWS = os.getenv('ASYNC_VIEWS', 'False') == 'True'
+ASYNC_DB_THREADS = int(os.getenv('ASYNC_DB_THREADS', 8))
+ASYNC_STREAM_THREADS = int(os.getenv('ASYNC_STREAM_THREADS', 2))
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -117,7 +178,7 @@ REST_FRAMEWORK = {
     ],
 
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
     ],
 
     'DEFAULT_PAGINATION_CLASS': 'api.pagination.PageNumberLimitPagination',
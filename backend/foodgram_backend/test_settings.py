@@ -0,0 +1,11 @@
+"""Настройки для запуска тестов.
+
+python manage.py test --settings=foodgram_backend.test_settings
+"""
+from .settings import *  # noqa: F401,F403
+from .settings import DATABASES
+
+# Зеркало основной базы для тестов маршрутизации чтения: отдельное
+# соединение с тестовой базой default, не входящее в DATABASE_REPLICAS.
+DATABASES['replica'] = {
+    **DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
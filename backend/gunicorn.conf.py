@@ -0,0 +1,119 @@
+"""Профиль gunicorn для продакшена.
+
+Число воркеров и потоков считается по числу CPU и ограничивается числом
+соединений с PostgreSQL, приложение загружается один раз до fork и
+прогревается, воркеры перезапускаются после max_requests запросов. Время
+запуска, готовности воркера и первого ответа пишется в лог и доступно в
+/api/_metrics, метрики воркеров суммируются через папку METRICS_DIR.
+"""
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+
+STARTED = time.monotonic()
+
+SERVER_MODE = os.getenv('SERVER_MODE', 'wsgi')
+CPU_COUNT = multiprocessing.cpu_count()
+
+# При CONN_MAX_AGE каждый поток воркера держит свое соединение с
+# PostgreSQL, поэтому воркеры, умноженные на потоки, не должны превышать
+# GUNICORN_DB_CONNECTIONS: max_connections сервера (100 по умолчанию)
+# за вычетом запаса на миграции, админку и команды управления.
+DB_CONNECTIONS = int(os.getenv('GUNICORN_DB_CONNECTIONS', 90))
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:8000')
+threads = int(os.getenv('GUNICORN_THREADS', min(CPU_COUNT * 2, 8)))
+if SERVER_MODE == 'asgi':
+    wsgi_app = 'foodgram_backend.asgi:application'
+    worker_class = 'uvicorn.workers.UvicornWorker'
+    # Запросы к БД асинхронных представлений и выгрузки выполняются в
+    # пулах потоков, у каждого потока свое соединение.
+    worker_db_connections = (int(os.getenv('ASYNC_DB_THREADS', 8))
+                             + int(os.getenv('ASYNC_STREAM_THREADS', 2)))
+else:
+    wsgi_app = 'foodgram_backend.wsgi:application'
+    worker_class = 'gthread' if threads > 1 else 'sync'
+    worker_db_connections = threads
+workers = int(os.getenv('GUNICORN_WORKERS', max(
+    min(CPU_COUNT * 2 + 1, DB_CONNECTIONS // worker_db_connections), 1)))
+
+preload_app = os.getenv('GUNICORN_PRELOAD', 'True') == 'True'
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', 100))
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 30))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', 5))
+accesslog = os.getenv('GUNICORN_ACCESSLOG', '-')
+
+# Запрос к /api/_metrics попадает в случайный воркер, поэтому воркеры
+# сохраняют метрики в общую папку, а ответ суммирует их по всем воркерам.
+if not os.getenv('METRICS_DIR'):
+    os.environ['METRICS_DIR'] = tempfile.mkdtemp(prefix='foodgram-metrics-')
+
+
+def format_timings(timings):
+    return ', '.join(
+        f'{name} {seconds * 1000:.1f} мс' for name, seconds in timings.items())
+
+
+def warm_up(log):
+    from django.db import connections
+
+    from api import metrics, warmup
+
+    timings = warmup.warm_up()
+    # Соединения с базой данных не должны наследоваться воркерами.
+    connections.close_all()
+    metrics.startup.update(
+        (f'warm_up_{name}', seconds) for name, seconds in timings.items())
+    log.info('Прогрев: %s', format_timings(timings))
+
+
+def on_starting(server):
+    # Счетчики прошлого запуска не суммируются с новыми.
+    os.makedirs(os.environ['METRICS_DIR'], exist_ok=True)
+    for path in glob.glob(os.path.join(os.environ['METRICS_DIR'], '*.json')):
+        os.remove(path)
+
+
+def when_ready(server):
+    if workers * worker_db_connections > DB_CONNECTIONS:
+        server.log.warning(
+            'Воркеры могут открыть %s соединений с БД при лимите %s',
+            workers * worker_db_connections, DB_CONNECTIONS)
+    if server.cfg.preload_app:
+        warm_up(server.log)
+    server.log.info(
+        'Мастер готов через %.3f с после запуска',
+        time.monotonic() - STARTED)
+
+
+def post_worker_init(worker):
+    if not worker.cfg.preload_app:
+        warm_up(worker.log)
+
+    from api import metrics
+
+    metrics.startup['worker_ready'] = time.monotonic() - STARTED
+    worker.log.info(
+        'Воркер %s готов через %.3f с после запуска мастера',
+        worker.pid, metrics.startup['worker_ready'])
+
+
+def post_request(worker, req, environ, resp):
+    from api import metrics
+
+    if 'first_response' in metrics.startup:
+        return
+    metrics.startup['first_response'] = time.monotonic() - STARTED
+    worker.log.info(
+        'Первый ответ воркера %s через %.3f с после запуска мастера',
+        worker.pid, metrics.startup['first_response'])
+
+
+def worker_exit(server, worker):
+    from api import metrics
+
+    metrics.flush()
@@ -1,5 +1,6 @@
 from django.contrib import admin
 
+from . import fulltext, shopping_list
 from .models import Ingredient, Recipe, RecipeIngredient, Tag
 
 
@@ -15,10 +16,27 @@ class RecipeAdmin(admin.ModelAdmin):
     list_filter = ('author', 'name', 'tags')
     inlines = [IngredientInline]
 
-    @admin.display(description='Добавлен в избранное')
+    def save_related(self, request, form, formsets, change):
+        """Переносит изменения ингредиентов рецепта в списки покупок."""
+        old_amounts = (
+            shopping_list.get_recipe_amounts(form.instance) if change else {})
+        super().save_related(request, form, formsets, change)
+        if change:
+            shopping_list.update_recipe(
+                form.instance, old_amounts,
+                shopping_list.get_recipe_amounts(form.instance))
+
+    def get_search_results(self, request, queryset, search_term):
+        """Метод поиска рецептов по полнотекстовому индексу."""
+        if not search_term.strip():
+            return queryset, False
+        return fulltext.filter_queryset(queryset, search_term), False
+
+    @admin.display(description='Добавлен в избранное',
+                   ordering='favorites_count')
     def is_favorited(self, obj):
         """Метод выводящий количество добавлений рецепта в избранное."""
-        return obj.favorites.count()
+        return obj.favorites_count
 
 
 @admin.register(Tag)
@@ -0,0 +1,130 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABLE = 'recipes_recipe_fts'
+
+SQLITE_CREATE = (
+    f'CREATE VIRTUAL TABLE IF NOT EXISTS {TABLE} USING fts5('
+    "name, text, ingredients, tokenize='unicode61 remove_diacritics 2')")
+SQLITE_DOCUMENTS = (
+    "SELECT r.id, r.name, r.text, COALESCE((SELECT group_concat(i.name, ' ') "
+    'FROM recipes_recipeingredient ri JOIN recipes_ingredient i '
+    "ON i.id = ri.ingredient_id WHERE ri.recipe_id = r.id), '') "
+    'FROM recipes_recipe r')
+SQLITE_MATCH = f'SELECT rowid FROM {TABLE} WHERE {TABLE} MATCH %s'
+SQLITE_RANK = (
+    f'SELECT -bm25({TABLE}, 10.0, 1.0, 4.0) FROM {TABLE} '
+    f'WHERE {TABLE} MATCH %s AND rowid = recipes_recipe.id')
+
+POSTGRES_CREATE = (
+    f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+    'recipe_id bigint PRIMARY KEY REFERENCES recipes_recipe (id) '
+    'ON DELETE CASCADE, document tsvector NOT NULL); '
+    f'CREATE INDEX IF NOT EXISTS {TABLE}_document_idx '
+    f'ON {TABLE} USING gin (document)')
+POSTGRES_DOCUMENTS = (
+    "SELECT r.id, setweight(to_tsvector('russian', r.name), 'A') "
+    "|| setweight(to_tsvector('russian', COALESCE(("
+    "SELECT string_agg(i.name, ' ') FROM recipes_recipeingredient ri "
+    'JOIN recipes_ingredient i ON i.id = ri.ingredient_id '
+    "WHERE ri.recipe_id = r.id), '')), 'B') "
+    "|| setweight(to_tsvector('russian', r.text), 'C') "
+    'FROM recipes_recipe r')
+POSTGRES_MATCH = (
+    f'SELECT recipe_id FROM {TABLE} '
+    "WHERE document @@ to_tsquery('russian', %s)")
+POSTGRES_RANK = (
+    f"SELECT ts_rank_cd(document, to_tsquery('russian', %s)) FROM {TABLE} "
+    'WHERE recipe_id = recipes_recipe.id')
+
+BACKENDS = {
+    'sqlite': {
+        'create': SQLITE_CREATE,
+        'key': 'rowid',
+        'columns': 'rowid, name, text, ingredients',
+        'documents': SQLITE_DOCUMENTS,
+        'match': SQLITE_MATCH,
+        'rank': SQLITE_RANK,
+    },
+    'postgresql': {
+        'create': POSTGRES_CREATE,
+        'key': 'recipe_id',
+        'columns': 'recipe_id, document',
+        'documents': POSTGRES_DOCUMENTS,
+        'match': POSTGRES_MATCH,
+        'rank': POSTGRES_RANK,
+    },
+}
+
+
+def get_backend(using=None):
+    return BACKENDS.get((using or connection).vendor)
+
+
+def create_index(schema_editor):
+    """Создает таблицу полнотекстового индекса для текущей СУБД."""
+    backend = get_backend(schema_editor.connection)
+    if backend is not None:
+        schema_editor.execute(backend['create'])
+
+
+def drop_index(schema_editor):
+    if get_backend(schema_editor.connection) is not None:
+        schema_editor.execute(f'DROP TABLE IF EXISTS {TABLE}')
+
+
+def update_index(recipe_ids=None, using=None):
+    """Пересобирает документы индекса для рецептов или для всех."""
+    using = using or connection
+    backend = get_backend(using)
+    if backend is None:
+        return
+    delete = f'DELETE FROM {TABLE}'
+    insert = f'INSERT INTO {TABLE} ({backend["columns"]}) ' + (
+        backend['documents'])
+    params = []
+    if recipe_ids is not None:
+        params = list(recipe_ids)
+        if not params:
+            return
+        placeholders = ', '.join(['%s'] * len(params))
+        delete += f' WHERE {backend["key"]} IN ({placeholders})'
+        insert += f' WHERE r.id IN ({placeholders})'
+    with transaction.atomic(using=using.alias), using.cursor() as cursor:
+        cursor.execute(delete, params)
+        cursor.execute(insert, params)
+
+
+def schedule_update(recipe_ids):
+    """Обновляет индекс рецептов после коммита текущей транзакции."""
+    recipe_ids = list(recipe_ids)
+    transaction.on_commit(lambda: update_index(recipe_ids))
+
+
+def build_query(query, vendor):
+    """Переводит строку поиска в запрос по префиксам всех слов."""
+    words = re.findall(r'\w+', query.lower())
+    if vendor == 'sqlite':
+        return ' '.join(f'"{word}"*' for word in words)
+    return ' & '.join(f'{word}:*' for word in words)
+
+
+def filter_queryset(queryset, query):
+    """Оставляет рецепты, подходящие под запрос, и добавляет search_rank.
+
+    Для СУБД без поддержки индекса используется поиск по вхождению.
+    """
+    backend = get_backend()
+    if backend is None:
+        return queryset.filter(
+            Q(name__icontains=query) | Q(text__icontains=query)
+            | Q(ingredients__name__icontains=query)).distinct()
+    search_query = build_query(query, connection.vendor)
+    if not search_query:
+        return queryset.none()
+    return queryset.filter(
+        pk__in=RawSQL(backend['match'], (search_query,))
+    ).annotate(search_rank=RawSQL(backend['rank'], (search_query,)))
@@ -0,0 +1,103 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from . import versions
+from .models import Recipe
+
+logger = logging.getLogger(__name__)
+
+IMAGE_VARIANTS = getattr(settings, 'RECIPE_IMAGE_VARIANTS', {
+    'thumbnail': (160, 160),
+    'card': (480, 360),
+})
+IMAGE_VARIANT_FORMAT = getattr(settings, 'RECIPE_IMAGE_FORMAT', 'WEBP')
+IMAGE_VARIANT_QUALITY = getattr(settings, 'RECIPE_IMAGE_QUALITY', 80)
+
+executor = ThreadPoolExecutor(
+    max_workers=getattr(settings, 'RECIPE_IMAGE_WORKERS', 2),
+    thread_name_prefix='recipe-images')
+
+
+def get_variant_name(name, variant):
+    """Возвращает путь к файлу варианта изображения."""
+    path = PurePosixPath(name)
+    return str(path.parent / 'variants' / (
+        f'{path.stem}_{variant}.{IMAGE_VARIANT_FORMAT.lower()}'))
+
+
+def render_variants(image_name):
+    """Сохраняет уменьшенные варианты изображения и возвращает их пути."""
+    with default_storage.open(image_name, 'rb') as file:
+        image = Image.open(file)
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'A' in image.getbands() else 'RGB')
+    variants = {}
+    for variant, size in IMAGE_VARIANTS.items():
+        resized = image.copy()
+        resized.thumbnail(size, Image.LANCZOS)
+        buffer = BytesIO()
+        resized.save(
+            buffer, IMAGE_VARIANT_FORMAT, quality=IMAGE_VARIANT_QUALITY)
+        name = get_variant_name(image_name, variant)
+        if default_storage.exists(name):
+            default_storage.delete(name)
+        variants[variant] = default_storage.save(
+            name, ContentFile(buffer.getvalue()))
+    return variants
+
+
+def delete_files(names):
+    for name in names:
+        try:
+            default_storage.delete(name)
+        except Exception:
+            logger.exception('Не удалось удалить файл %s', name)
+
+
+def build_variants(recipe_id, stale=()):
+    """Строит варианты изображения рецепта и сохраняет их пути.
+
+    Файлы stale, варианты замененного изображения, удаляются в той же
+    задаче. Если изображение снова заменили, пока строились варианты,
+    удаляются и только что построенные файлы.
+    """
+    stale = set(stale)
+    close_old_connections()
+    try:
+        image_name = Recipe.objects.filter(
+            pk=recipe_id).values_list('image', flat=True).first()
+        if not image_name:
+            return
+        variants = render_variants(image_name)
+        if Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+                image_variants=variants, updated_at=timezone.now()):
+            versions.bump(versions.RECIPES)
+            stale -= set(variants.values())
+        else:
+            stale |= set(variants.values())
+    except Exception:
+        logger.exception(
+            'Не удалось построить варианты изображения рецепта %s',
+            recipe_id)
+    finally:
+        delete_files(stale)
+        close_old_connections()
+
+
+def schedule_variants(recipe, stale=()):
+    """Ставит построение вариантов изображения и удаление файлов stale в
+    очередь после коммита."""
+    stale = list(stale)
+    transaction.on_commit(
+        lambda: executor.submit(build_variants, recipe.pk, stale))
@@ -0,0 +1,25 @@
+# Generated by Django 3.2.16 on 2026-10-17 03:38
+
+from django.db import migrations
+
+from recipes import fulltext
+
+
+def create_fulltext_index(apps, schema_editor):
+    fulltext.create_index(schema_editor)
+    fulltext.update_index(using=schema_editor.connection)
+
+
+def drop_fulltext_index(apps, schema_editor):
+    fulltext.drop_index(schema_editor)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_recipe_pub_date_id_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fulltext_index, drop_fulltext_index),
+    ]
@@ -1,10 +1,13 @@
 from colorfield.fields import ColorField
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import connections, models, router
+from django.db.models import Exists, OuterRef, Prefetch, Value
+from django.utils import timezone
 
 from foodgram_backend.constants import (
     MEDIUM_FIELD_LENGTH, MIN_VALIDATOR_NUM, MAX_VALIDATOR_NUM)
+from users.models import Subscription
 
 User = get_user_model()
 
@@ -60,6 +63,63 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
+def add_ingredients(rows):
+    """Добавляет ингредиенты из пар (название, единица измерения).
+
+    Существующие пропускаются по уникальному ограничению. Возвращает
+    число строк, вставленных этим запросом, без ингредиентов, которые
+    успел добавить параллельный процесс.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    connection = connections[router.db_for_write(Ingredient)]
+    quote = connection.ops.quote_name
+    name, unit = (quote(Ingredient._meta.get_field(field).column)
+                  for field in ('name', 'measurement_unit'))
+    sql = (f'INSERT INTO {quote(Ingredient._meta.db_table)} ({name}, {unit}) '
+           f'VALUES {", ".join(["(%s, %s)"] * len(rows))} '
+           f'ON CONFLICT ({name}, {unit}) DO NOTHING RETURNING id')
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [value for row in rows for value in row])
+        return len(cursor.fetchall())
+
+
+class RecipeQuerySet(models.QuerySet):
+    """Набор запросов для чтения рецептов."""
+
+    def with_user_flags(self, user):
+        """Добавляет флаги избранного и списка покупок пользователя."""
+        if not user.is_authenticated:
+            return self.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False))
+        return self.annotate(
+            is_favorited=Exists(Favorite.objects.filter(
+                user=user, recipe=OuterRef('pk'))),
+            is_in_shopping_cart=Exists(ShoppingCart.objects.filter(
+                user=user, recipe=OuterRef('pk'))))
+
+    def feed(self, user):
+        """Рецепты авторов, на которых подписан пользователь.
+
+        Авторы выбираются подзапросом author_id IN (...) по индексу
+        подписок, поэтому лента строится одним запросом.
+        """
+        return self.filter(author__in=Subscription.objects.filter(
+            user=user).values('subscribe'))
+
+    def with_related(self):
+        """Подгружает автора, теги и ингредиенты рецептов фиксированным
+        числом запросов."""
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch(
+                'recipe_ingredients',
+                queryset=RecipeIngredient.objects.select_related(
+                    'ingredient')))
+
+
 class Recipe(models.Model):
     """Модель рецепта."""
 
@@ -94,6 +154,12 @@ class Recipe(models.Model):
         upload_to='api/media/',
         verbose_name='Изображение'
     )
+    image_variants = models.JSONField(
+        verbose_name='Уменьшенные изображения',
+        default=dict,
+        blank=True,
+        editable=False
+    )
     tags = models.ManyToManyField(
         Tag,
         verbose_name='Теги',
@@ -109,11 +175,34 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в избранное',
+        default=0,
+        editable=False
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='Добавлений в списки покупок',
+        default=0,
+        editable=False
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         verbose_name = 'рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(
+                fields=('-pub_date', '-id'), name='recipe_pub_date_id_idx'),
+            models.Index(
+                fields=('author', '-pub_date', '-id'),
+                name='recipe_author_pub_date_idx'),
+        ]
 
 
 class RecipeIngredient(models.Model):
@@ -204,3 +293,106 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} - {self.recipe}'
+
+
+def add_user_recipes(model, user_id, recipe_ids):
+    """Добавляет существующие рецепты в избранное или список покупок.
+
+    Записи, которые уже есть, пропускаются по уникальному ограничению
+    (user, recipe). Возвращает id рецептов, вставленных этим запросом,
+    поэтому параллельные пакеты не учитывают один рецепт дважды. INSERT
+    ... ON CONFLICT ... RETURNING поддерживают PostgreSQL и SQLite 3.35+.
+    """
+    return execute_user_recipes(
+        model, user_id, recipe_ids,
+        'INSERT INTO {table} ({user}, {recipe}) '
+        'SELECT %s, id FROM {recipes} WHERE id IN ({placeholders}) '
+        'ON CONFLICT ({user}, {recipe}) DO NOTHING RETURNING {recipe}')
+
+
+def remove_user_recipes(model, user_id, recipe_ids):
+    """Убирает рецепты из избранного или списка покупок одним DELETE.
+
+    Сигналы post_delete не отправляются. Возвращает id рецептов,
+    удаленных этим запросом: параллельный DELETE тех же записей их уже
+    не вернет, поэтому счетчики не уменьшаются дважды.
+    """
+    return execute_user_recipes(
+        model, user_id, recipe_ids,
+        'DELETE FROM {table} WHERE {user} = %s '
+        'AND {recipe} IN ({placeholders}) RETURNING {recipe}')
+
+
+def execute_user_recipes(model, user_id, recipe_ids, sql):
+    """Выполняет запрос ... RETURNING к записям пользователя и рецептов и
+    возвращает множество id рецептов из ответа."""
+    recipe_ids = list(recipe_ids)
+    if not recipe_ids:
+        return set()
+    connection = connections[router.db_for_write(model)]
+    quote = connection.ops.quote_name
+    sql = sql.format(
+        table=quote(model._meta.db_table),
+        recipes=quote(Recipe._meta.db_table),
+        user=quote(model._meta.get_field('user').column),
+        recipe=quote(model._meta.get_field('recipe').column),
+        placeholders=', '.join(['%s'] * len(recipe_ids)))
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [user_id, *recipe_ids])
+        return {row[0] for row in cursor.fetchall()}
+
+
+class ShoppingListItem(models.Model):
+    """Модель суммарного количества ингредиента в списке покупок."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        verbose_name='Пользователь',
+        related_name='shopping_list_items'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        verbose_name='Ингрeдиент',
+        related_name='shopping_list_items'
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество'
+    )
+
+    class Meta:
+        verbose_name = 'ингредиент списка покупок'
+        verbose_name_plural = 'Ингредиенты списков покупок'
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique_user_ingredient_shopping_list')]
+
+    def __str__(self):
+        return f'{self.user} - {self.ingredient}: {self.total_amount}'
+
+
+class ContentVersion(models.Model):
+    """Модель счетчика версий данных для условных запросов."""
+
+    key = models.CharField(
+        verbose_name='Ключ',
+        unique=True,
+        max_length=MEDIUM_FIELD_LENGTH
+    )
+    version = models.PositiveBigIntegerField(
+        verbose_name='Версия',
+        default=0
+    )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        default=timezone.now
+    )
+
+    class Meta:
+        verbose_name = 'версия данных'
+        verbose_name_plural = 'Версии данных'
+
+    def __str__(self):
+        return f'{self.key}: {self.version}'
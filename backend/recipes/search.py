@@ -0,0 +1,91 @@
+import threading
+import time
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+
+from .models import Ingredient
+
+INGREDIENT_INDEX_TTL = getattr(settings, 'INGREDIENT_INDEX_TTL', 300)
+
+
+def normalize(value):
+    """Приводит строку к виду для поиска без учета регистра и буквы ё."""
+    return value.strip().casefold().replace('ё', 'е')
+
+
+class IngredientSearchIndex:
+    """Отсортированный индекс названий ингредиентов в памяти процесса.
+
+    Поиск по префиксу выполняется бинарным поиском, совпадения по
+    подстроке добавляются после совпадений по префиксу. Индекс
+    перестраивается при изменении ингредиентов в этом процессе, при смене
+    версии каталога или по истечении INGREDIENT_INDEX_TTL секунд, чтобы
+    подхватить изменения из других процессов.
+    """
+
+    def __init__(self, ttl=INGREDIENT_INDEX_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._generation = 0
+        self._data = None
+
+    def invalidate(self):
+        """Помечает индекс устаревшим."""
+        with self._lock:
+            self._generation += 1
+            self._data = None
+
+    def _build(self, version=None):
+        rows = Ingredient.objects.values('id', 'name', 'measurement_unit')
+        entries = sorted(
+            (normalize(row['name']), row['id'], row) for row in rows)
+        keys = [key for key, _, _ in entries]
+        items = [row for _, _, row in entries]
+        starts = []
+        offset = 0
+        for key in keys:
+            starts.append(offset)
+            offset += len(key) + 1
+        return (keys, items, '\n'.join(keys), starts, version,
+                time.monotonic())
+
+    def _load(self, version=None):
+        data = self._data
+        if (data is not None
+                and (version is None or data[-2] == version)
+                and time.monotonic() - data[-1] < self.ttl):
+            return data
+        generation = self._generation
+        data = self._build(version)
+        with self._lock:
+            if generation == self._generation:
+                self._data = data
+        return data
+
+    def search(self, query='', limit=None, version=None):
+        """Возвращает ингредиенты, название которых содержит query.
+
+        Сначала идут совпадения по началу названия, затем по подстроке.
+        Если передана версия каталога, индекс перестраивается при ее
+        изменении, и в любом случае не реже одного раза в ttl секунд.
+        """
+        keys, items, text, starts, _, _ = self._load(version)
+        prefix = normalize(query)
+        start = bisect_left(keys, prefix)
+        end = bisect_left(keys, prefix + '\U0010ffff', start)
+        result = items[start:end]
+        if not prefix or '\n' in prefix:
+            return result if limit is None else result[:limit]
+        position = text.find(prefix)
+        while position != -1 and (limit is None or len(result) < limit):
+            number = bisect_right(starts, position) - 1
+            if position != starts[number]:
+                result.append(items[number])
+            if number + 1 == len(starts):
+                break
+            position = text.find(prefix, starts[number + 1])
+        return result if limit is None else result[:limit]
+
+
+ingredient_index = IngredientSearchIndex()
@@ -0,0 +1,159 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Sum
+
+from .models import RecipeIngredient, ShoppingCart, ShoppingListItem
+
+
+def get_recipe_amounts(recipe):
+    """Возвращает количество каждого ингредиента рецепта."""
+    return dict(RecipeIngredient.objects.filter(
+        recipe=recipe).values_list('ingredient_id', 'amount'))
+
+
+@transaction.atomic
+def apply_deltas(user_ids, deltas):
+    """Изменяет суммы ингредиентов в списках покупок пользователей.
+
+    Таблица ShoppingListItem хранит готовую агрегацию списка покупок,
+    поэтому выгрузка списка читает несколько строк без группировки.
+    """
+    deltas = {key: value for key, value in deltas.items() if value}
+    user_ids = list(user_ids)
+    if not deltas or not user_ids:
+        return
+    # select_for_update не блокирует еще не созданные строки, поэтому
+    # недостающие строки сначала вставляются с нулем: параллельная
+    # вставка той же строки пропускается, а не падает на уникальности.
+    ShoppingListItem.objects.bulk_create(
+        [ShoppingListItem(user_id=user_id, ingredient_id=ingredient_id,
+                          total_amount=0)
+         for user_id in user_ids
+         for ingredient_id, delta in deltas.items() if delta > 0],
+        ignore_conflicts=True)
+    to_update, to_delete = [], []
+    for item in ShoppingListItem.objects.select_for_update().filter(
+            user_id__in=user_ids, ingredient_id__in=deltas).order_by('pk'):
+        item.total_amount += deltas[item.ingredient_id]
+        if item.total_amount > 0:
+            to_update.append(item)
+        else:
+            to_delete.append(item.pk)
+    ShoppingListItem.objects.bulk_update(to_update, ('total_amount',))
+    ShoppingListItem.objects.filter(pk__in=to_delete).delete()
+
+
+def get_recipes_amounts(recipe_ids):
+    """Возвращает суммарное количество ингредиентов нескольких рецептов."""
+    return dict(RecipeIngredient.objects.filter(
+        recipe__in=recipe_ids).values('ingredient_id').annotate(
+            total=Sum('amount')).values_list(
+                'ingredient_id', 'total').order_by())
+
+
+def add_recipe(user, recipe):
+    """Добавляет ингредиенты рецепта в список покупок пользователя."""
+    apply_deltas((user.id,), get_recipe_amounts(recipe))
+
+
+def remove_recipe(user, recipe):
+    """Убирает ингредиенты рецепта из списка покупок пользователя."""
+    apply_deltas((user.id,), {
+        ingredient_id: -amount
+        for ingredient_id, amount in get_recipe_amounts(recipe).items()})
+
+
+def add_recipes(user, recipe_ids):
+    """Добавляет ингредиенты нескольких рецептов в список покупок."""
+    apply_deltas((user.id,), get_recipes_amounts(recipe_ids))
+
+
+def remove_recipes(user, recipe_ids):
+    """Убирает ингредиенты нескольких рецептов из списка покупок."""
+    apply_deltas((user.id,), {
+        ingredient_id: -amount
+        for ingredient_id, amount in get_recipes_amounts(
+            recipe_ids).items()})
+
+
+def remove_recipe_everywhere(recipe):
+    """Убирает ингредиенты рецепта из всех списков покупок с ним."""
+    apply_deltas(
+        ShoppingCart.objects.filter(
+            recipe=recipe).values_list('user_id', flat=True),
+        {ingredient_id: -amount
+         for ingredient_id, amount in get_recipe_amounts(recipe).items()})
+
+
+def update_recipe(recipe, old_amounts, new_amounts):
+    """Переносит изменение ингредиентов рецепта в списки покупок."""
+    deltas = Counter(new_amounts)
+    deltas.subtract(old_amounts)
+    apply_deltas(
+        ShoppingCart.objects.filter(
+            recipe=recipe).values_list('user_id', flat=True),
+        deltas)
+
+
+def calculate_totals(user_ids=None):
+    """Считает суммы ингредиентов в списках покупок по корзинам."""
+    if user_ids is None:
+        queryset = RecipeIngredient.objects.filter(
+            recipe__shopping_carts__isnull=False)
+    else:
+        queryset = RecipeIngredient.objects.filter(
+            recipe__shopping_carts__user__in=user_ids)
+    return {
+        (row['recipe__shopping_carts__user'], row['ingredient']): row['total']
+        for row in queryset.values(
+            'recipe__shopping_carts__user', 'ingredient'
+        ).annotate(total=Sum('amount')).order_by().iterator()
+    }
+
+
+def get_stored_totals(user_ids=None):
+    """Возвращает суммы ингредиентов, сохраненные в таблице."""
+    queryset = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user__in=user_ids)
+    return {
+        (user_id, ingredient_id): total
+        for user_id, ingredient_id, total in queryset.values_list(
+            'user_id', 'ingredient_id', 'total_amount').iterator()
+    }
+
+
+def find_inconsistencies(user_ids=None):
+    """Сравнивает таблицу с агрегацией на лету.
+
+    Возвращает список кортежей (user_id, ingredient_id, сохраненное
+    значение, ожидаемое значение) для расходящихся записей.
+    """
+    expected = calculate_totals(user_ids)
+    stored = get_stored_totals(user_ids)
+    return sorted(
+        (user_id, ingredient_id,
+         stored.get((user_id, ingredient_id)),
+         expected.get((user_id, ingredient_id)))
+        for user_id, ingredient_id in expected.keys() | stored.keys()
+        if stored.get((user_id, ingredient_id))
+        != expected.get((user_id, ingredient_id))
+    )
+
+
+@transaction.atomic
+def rebuild(user_ids=None):
+    """Пересобирает таблицу списков покупок по корзинам."""
+    queryset = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        queryset = queryset.filter(user__in=user_ids)
+    queryset.delete()
+    items = [
+        ShoppingListItem(
+            user_id=user_id, ingredient_id=ingredient_id, total_amount=total)
+        for (user_id, ingredient_id), total in calculate_totals(
+            user_ids).items()
+    ]
+    ShoppingListItem.objects.bulk_create(items, batch_size=1000)
+    return len(items)
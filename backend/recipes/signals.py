@@ -0,0 +1,104 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from users.models import Subscription
+from . import fulltext, shopping_list, versions
+from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                     ShoppingCart, Tag)
+from .search import ingredient_index
+from .tags import invalidate_tag_map
+
+User = get_user_model()
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name'}
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    """Сбрасывает индекс поиска при изменении ингредиентов."""
+    ingredient_index.invalidate()
+
+
+@receiver(pre_delete, sender=Recipe)
+def remove_recipe_from_shopping_lists(instance, **kwargs):
+    """Убирает ингредиенты удаляемого рецепта из списков покупок."""
+    shopping_list.remove_recipe_everywhere(instance)
+
+
+@receiver((post_save, post_delete), sender=Recipe)
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def bump_recipes_version(**kwargs):
+    """Увеличивает версию рецептов при их изменении."""
+    versions.bump(versions.RECIPES)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def bump_recipe_tags_version(action, **kwargs):
+    """Увеличивает версию рецептов при изменении их тегов."""
+    if action.startswith('post_'):
+        versions.bump(versions.RECIPES)
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def bump_tags_version(**kwargs):
+    """Увеличивает версию тегов при их изменении."""
+    versions.bump(versions.TAGS)
+    invalidate_tag_map()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def bump_ingredients_version(**kwargs):
+    """Увеличивает версию ингредиентов при их изменении."""
+    versions.bump(versions.INGREDIENTS)
+
+
+@receiver((post_save, post_delete), sender=User)
+def bump_users_version(instance, update_fields=None, created=False,
+                       **kwargs):
+    """Увеличивает версию пользователей при изменении профиля, а версию
+    авторов - только если изменился профиль пользователя с рецептами."""
+    if update_fields is not None and set(update_fields) <= {'last_login'}:
+        return
+    versions.bump(versions.USERS)
+    if (not created
+            and (update_fields is None or AUTHOR_FIELDS & set(update_fields))
+            and Recipe.objects.filter(author_id=instance.pk).exists()):
+        versions.bump(versions.AUTHORS)
+
+
+@receiver((post_save, post_delete), sender=Favorite)
+@receiver((post_save, post_delete), sender=ShoppingCart)
+@receiver((post_save, post_delete), sender=Subscription)
+def bump_user_version(instance, **kwargs):
+    """Увеличивает версию избранного, списка покупок и подписок
+    пользователя."""
+    versions.bump(versions.user_key(instance.user_id))
+
+
+@receiver(post_save, sender=Recipe)
+def update_recipe_search_index(instance, **kwargs):
+    """Обновляет поисковый документ рецепта после сохранения."""
+    fulltext.schedule_update((instance.pk,))
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def update_recipe_ingredients_search_index(instance, **kwargs):
+    """Обновляет поисковый документ при изменении ингредиентов рецепта."""
+    fulltext.schedule_update((instance.recipe_id,))
+
+
+@receiver(post_save, sender=Ingredient)
+def update_ingredient_search_index(instance, created, **kwargs):
+    """Обновляет поисковые документы рецептов с переименованным
+    ингредиентом."""
+    if not created:
+        fulltext.schedule_update(RecipeIngredient.objects.filter(
+            ingredient=instance).values_list('recipe_id', flat=True))
+
+
+@receiver(post_delete, sender=Recipe)
+def remove_recipe_from_search_index(instance, **kwargs):
+    """Удаляет поисковый документ удаленного рецепта."""
+    fulltext.schedule_update((instance.pk,))
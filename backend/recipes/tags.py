@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Tag
+
+TAG_MAP_CACHE_KEY = 'tag_slug_map'
+TAG_MAP_CACHE_TIMEOUT = getattr(settings, 'TAG_MAP_CACHE_TIMEOUT', 3600)
+
+
+def get_tag_map(refresh=False):
+    """Возвращает словарь слаг -> id тега из кеша."""
+    tag_map = None if refresh else cache.get(TAG_MAP_CACHE_KEY)
+    if tag_map is None:
+        tag_map = dict(Tag.objects.values_list('slug', 'id'))
+        cache.set(TAG_MAP_CACHE_KEY, tag_map, TAG_MAP_CACHE_TIMEOUT)
+    return tag_map
+
+
+def get_tag_ids(slugs):
+    """Возвращает id тегов по слагам, неизвестные слаги пропускаются.
+
+    Если слага нет в кеше, словарь перечитывается из базы, чтобы новые
+    теги из других процессов находились сразу.
+    """
+    tag_map = get_tag_map()
+    if any(slug not in tag_map for slug in slugs):
+        tag_map = get_tag_map(refresh=True)
+    return [tag_map[slug] for slug in slugs if slug in tag_map]
+
+
+def invalidate_tag_map():
+    cache.delete(TAG_MAP_CACHE_KEY)
@@ -0,0 +1,41 @@
+from django.db import IntegrityError, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import ContentVersion
+
+RECIPES = 'recipes'
+TAGS = 'tags'
+INGREDIENTS = 'ingredients'
+USERS = 'users'
+# Данные авторов во фрагментах рецептов. В отличие от USERS, версия не
+# меняется при регистрации и правке пользователей без рецептов.
+AUTHORS = 'authors'
+
+
+def user_key(user_id):
+    """Ключ версии избранного, списка покупок и подписок пользователя."""
+    return f'user:{user_id}'
+
+
+def bump(key):
+    """Увеличивает версию данных по ключу."""
+    updated = ContentVersion.objects.filter(key=key).update(
+        version=F('version') + 1, updated_at=timezone.now())
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            ContentVersion.objects.create(key=key, version=1)
+    except IntegrityError:
+        bump(key)
+
+
+def get_versions(keys):
+    """Возвращает словарь ключ -> (версия, дата изменения)."""
+    versions = {key: (0, None) for key in keys}
+    versions.update(
+        (key, (version, updated_at))
+        for key, version, updated_at in ContentVersion.objects.filter(
+            key__in=keys).values_list('key', 'version', 'updated_at'))
+    return versions